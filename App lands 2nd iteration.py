@@ -1,6 +1,5 @@
 # gaming_food_platform.py
 import flet as ft
-import mysql.connector
 import pyttsx3
 import os
 import flet_audio
@@ -8,307 +7,416 @@ import json
 from flet_audio import Audio
 
 # ---------- 1. CONFIGURATION ----------
-LANGUAGES = {'en': 'English', 'ta': 'தமிழ்', 'hi': 'हिंदी'}
 DB_CONFIG = {
     "host": "localhost",
     "user": "db_user",
     "password": "root",
     "database": "farming_db",
 }
+DB_POOL_SIZE = 10        # max open connections shared by all sessions
+DB_POOL_MAX_IDLE = 300   # seconds before an idle connection is dropped
 AUDIO_PATH = "audio_files"  # base directory for TTS audio
+AUDIO_CACHE_MAX_BYTES = 200 * 1024 * 1024
+AUDIO_PREWARM_LANGS = ['en', 'ta', 'hi']
 os.makedirs(AUDIO_PATH, exist_ok=True)
 
 # ---------- 2. LOCALIZATION -----------
-# Example translation dict; expand as needed.
-STRINGS = {
-    'en': {
-        'login': "Login",
-        'register': "Register",
-        'phone': "Phone Number",
-        'pin': "PIN",
-        'submit': "Submit",
-        'welcome': "Welcome!",
-        'choose_lang': "Choose Language",
-        'literacy_test': "Technical Literacy Test",
-        'swipe_test': "Swipe Left to Continue",
-        'tap_test': "Tap the Button",
-        'nav_test': "Navigate to Next",
-        'cam_test': "Take a Photo",
-        'tasks': "Daily Tasks",
-        # ... other keys
-    },
-    'ta': {
-        'login': "உள்நுழைக",
-        'register': "பதிவு செய்யவும்",
-        'phone': "தொலைபேசி எண்",
-        'pin': "பின்",
-        'submit': "சமர்ப்பிக்க",
-        'welcome': "வரவேற்கின்றேன்!",
-        'choose_lang': "மொழியைத் தேர்ந்தெடுக்கவும்",
-        'literacy_test': "தொழில்நுட்ப அறிவு பரிசோதனை",
-        'swipe_test': "மறுதிசை இழுக்கவும்",
-        'tap_test': "பட்டனை அழுத்தவும்",
-        'nav_test': "அடுத்ததாக செல்லவும்",
-        'cam_test': "புகைப்படம் எடுக்கவும்",
-        'tasks': "தினசரி பணிகள்",
-    },
-    'hi': {
-        'login': "लॉगिन करें",
-        'register': "पंजीकरण करें",
-        'phone': "फ़ोन नंबर",
-        'pin': "पिन",
-        'submit': "जमा करें",
-        'welcome': "स्वागत है!",
-        'choose_lang': "भाषा चुनें",
-        'literacy_test': "तकनीकी साक्षरता परीक्षण",
-        'swipe_test': "आगे बढ़ने के लिए स्वाइप करें",
-        'tap_test': "बटन पर टैप करें",
-        'nav_test': "आगे नेविगेट करें",
-        'cam_test': "फोटो लें",
-        'tasks': "दैनिक कार्य",
-    }
-}
-app_language = 'en'  # default; will be set at runtime
+# Messages live in locales/<lang>.json, compiled to .mo and loaded per language on first use.
+from catalog import catalog
+LANGUAGES = catalog.languages()  # {'en': 'English', 'ta': 'தமிழ்', 'hi': 'हिंदी'}
+DEFAULT_LANGUAGE = 'en'
+
+# Language, literacy level and UI params are per page session, never module globals.
+from session import sessions
 
-def t(key):
-    return STRINGS[app_language].get(key, key)
+def t(key, ctx):
+    return catalog.bundle(ctx.lang).get(key, key)
 
 # ---------- 3. TEXT-TO-SPEECH ----------
-engine = pyttsx3.init()
-def tts(text, lang_code):
-    """Generate or fetch TTS audio file for given text/language."""
-    safe_key = f"{lang_code}_{abs(hash(text))}.wav"
-    fp = os.path.join(AUDIO_PATH, safe_key)
-    if not os.path.exists(fp):
-        engine.setProperty('voice', lang_code)
-        engine.save_to_file(text, fp)
-        engine.runAndWait()
-    return fp
+from tts_cache import TTSCache
+from tts_worker import SynthesisWorker
+engine = None  # created on the synthesis thread, which is its only user
+
+def _render_tts(text, lang_code, voice, fp):
+    global engine
+    if engine is None:
+        engine = pyttsx3.init()
+    engine.setProperty('voice', voice)
+    engine.save_to_file(text, fp)
+    engine.runAndWait()
+
+audio_cache = TTSCache(AUDIO_PATH, _render_tts, max_bytes=AUDIO_CACHE_MAX_BYTES)
+speech_queue = SynthesisWorker(audio_cache)
+
+def _synthesize(text, lang_code):
+    return speech_queue.submit(text, lang_code, voice=lang_code)
+
+def tts(text, ctx):
+    """Queue TTS in the session's language; returns a Future of the audio file path."""
+    return _synthesize(text, ctx.lang)
+
+def prewarm_audio(wait=False):
+    """Queue every catalog entry so screens never wait on TTS."""
+    jobs = [_synthesize(text, lang) for lang in AUDIO_PREWARM_LANGS for text in catalog.bundle(lang).values()]
+    if wait:
+        for job in jobs:
+            job.result()
+    return len(jobs)
 
 # ---------- 4. DATABASE ----------
+# Tables and indexes come from migrations.py, run once per deploy.
+import time
+import migrations
+from db_pool import mysql_pool
+db_pool = mysql_pool(DB_CONFIG, size=DB_POOL_SIZE, max_idle=DB_POOL_MAX_IDLE)
+
 def db_connect():
-    return mysql.connector.connect(**DB_CONFIG)
+    """Borrow a pooled connection; use as `with db_connect() as db:`."""
+    return db_pool.connection()
+
+# Login and every screen read the farmer through a read-through cache of the
+# columns they use; writes to a farmer's row must invalidate it.
+from farmer_profiles import ProfileCache
+PROFILE_TTL = 300   # seconds
+profiles = ProfileCache(db_pool, ttl=PROFILE_TTL)
 
 def db_get_farmer(phone):
-    with db_connect() as db:
-        c = db.cursor(dictionary=True)
-        c.execute("SELECT * FROM farmers WHERE phone=%s", (phone,))
-        return c.fetchone()
+    """FarmerProfile (phone, pin_hash, language, literacy_lvl, crop, village) or None."""
+    return profiles.get(phone)
 
 def db_register_farmer(phone, pin_hash, lang, lit_level):
     with db_connect() as db:
         c = db.cursor()
-        c.execute("INSERT INTO farmers (phone, pin_hash, language, literacy_lvl) VALUES (%s, %s, %s, %s)",
-                  (phone, pin_hash, lang, lit_level))
+        c.execute("INSERT INTO farmers (phone, pin_hash, language, literacy_lvl, created_at) "
+                  "VALUES (%s, %s, %s, %s, %s)", (phone, pin_hash, lang, lit_level, time.time()))
         db.commit()
+    profiles.invalidate(phone)
 
 # ---------- 5. PIN HASHING ----------
-import bcrypt
-def hash_pin(pin):
-    return bcrypt.hashpw(pin.encode(), bcrypt.gensalt()).decode()
+# bcrypt runs in a bounded process pool so a login never blocks other sessions.
+from auth_service import AuthService
+AUTH_WORKERS = None   # None = one per CPU core
+BCRYPT_ROUNDS = 12
+auth = AuthService(workers=AUTH_WORKERS, rounds=BCRYPT_ROUNDS)
+
+async def hash_pin(pin):
+    return await auth.hash_pin(pin)
 
-def check_pin(pin, pin_hash):
-    return bcrypt.checkpw(pin.encode(), pin_hash.encode())
+async def check_pin(phone, pin, pin_hash):
+    return await auth.check_pin(phone, pin, pin_hash)
 
 # ---------- 6. AUDIO CONTROL ----------
-audio_controls = {}
-def play_audio(page, text, lang_code):
-    # Generate or fetch audio and play
-    path = tts(text, lang_code)
-    if lang_code not in audio_controls:
-        audio_controls[lang_code] = Audio(src=path, volume=1)
-        page.overlay.append(audio_controls[lang_code])
-    audio_controls[lang_code].src = path
-    audio_controls[lang_code].update()
-    audio_controls[lang_code].play()
+def play_audio(ctx, text):
+    # Returns at once; playback starts when the synthesis worker has the file
+    tts(text, ctx).add_done_callback(lambda job: _start_playback(ctx, job))
+
+def _start_playback(ctx, job):
+    if job.exception() is not None:
+        return
+    path = job.result()
+    if ctx.audio is None:  # one Audio control per page session
+        ctx.audio = Audio(src=path, volume=1)
+        ctx.page.overlay.append(ctx.audio)
+    ctx.audio.src = path
+    ctx.audio.update()
+    ctx.audio.play()
 
 # ---------- 7. UI/UX ADAPTATION ----------
-def get_ui_params(lit_level):
-    if lit_level == 0:  # Low
-        return {'button_size': 50, 'icon_size': 42, 'use_voice': True,
-                'layout':'linear', 'help':True}
-    elif lit_level == 1:  # Medium
-        return {'button_size': 42, 'icon_size': 32, 'use_voice': False,
-                'layout':'grid', 'help':False}
-    else:  # High
-        return {'button_size': 32, 'icon_size': 22, 'use_voice': False,
-                'layout':'advanced', 'help':False}
-
-# ---------- 8. IMAGE RECOGNITION (Backend API Placeholder) ----------
-import requests
+# ctx.ui is an immutable UIProfile (ui_profiles.py, specs/ui_profiles.json)
+# picked from the measured literacy score, with its sizes precomputed. Views
+# are cached per profile, so each screen's layout is built once per profile.
+def task_button(ctx, task, on_click):
+    ui = ctx.ui
+    label = f"{task['desc']} ({task['points']})" if ui.show_points else task["desc"]
+    btn = ft.ElevatedButton(label, width=ui.task_width, height=ui.task_height,
+                            on_click=on_click, tooltip=f"{task['points']} points")
+    if ui.use_voice:
+        btn.on_hover = lambda e, txt=task["desc"]: play_audio(ctx, txt)
+    return btn
+
+# ---------- 8. IMAGE RECOGNITION (local inference service) ----------
+import asyncio
+from recognition_server import RecognitionClient, start_local_server
+RECOGNITION_PORT = 8000
+START_LOCAL_RECOGNIZER = True  # False when the service runs on its own host
+recognizer = RecognitionClient(f"http://localhost:{RECOGNITION_PORT}/crop-recognize")
+
+# Originals go to a content-addressed blob store; only a model-sized copy is sent on.
+from blob_store import BlobStore
+from image_ingest import reduce_image
+upload_store = BlobStore("uploads", db_pool)
+
 def recognize_image(img_bytes):
-    # Replace with your REST API endpoint for the ML model
-    url = 'http://localhost:8000/crop-recognize'
-    files = {'file': ('image.jpg', img_bytes)}
-    r = requests.post(url, files=files)
-    return r.json()  # {'crop_type': 'rice', 'status': 'healthy', ...}
+    try:
+        return recognizer.recognize(img_bytes)  # {'crop_type': 'rice', 'status': 'healthy', ...}
+    except Exception:
+        return {}
+
+def recognize_upload(path):
+    """Store the photo and recognize it, reusing the result for a known blob."""
+    digest = upload_store.put(path)
+    result = upload_store.recognition(digest)
+    if result is None:
+        result = recognize_image(reduce_image(path))
+        if result:
+            upload_store.set_recognition(digest, result)
+    return digest, result
+
+from farm_repository import INSERT_TASK
+
+def db_add_task(c, phone, task_name, digest, result):
+    """Task history row on the caller's transaction (the ledger award's); its
+    blob reference keeps the photo out of upload_store.gc()."""
+    c.execute(db_pool.sql(INSERT_TASK), (phone, task_name, digest, (result or {}).get("crop_type"), time.time()))
+    upload_store.add_refs(c, [digest])
 
 # ---------- 9. MAIN APP ----------
+import literacy_engine
+from literacy_engine import LiteracyRun
+from view_cache import ViewCache, patch
+LITERACY_SUITE = "farmer"
+
+# Each farmer's tasks are written nightly (--schedule-tasks) and read once per day.
+import task_scheduler
+daily_tasks = task_scheduler.DailyTasks(db_pool)
+TASK_HISTORY_DAYS = 14
+
+# Completions are awarded once per (farmer, day, task); the leaderboard is kept in memory.
+from points_ledger import PointsLedger
+ledger = PointsLedger(db_pool)
+# Badges, streaks and village challenges (specs/gamification_rules.json), evaluated per event.
+import threading
+from rewards import Rewards
+rewards = Rewards(db_pool)
+
+def warm_rewards():
+    """Replay the ledger into the leaderboard and badge state once, at startup,
+    so the first farmer's tasks screen does not wait on it."""
+    def replay():
+        ledger.load_leaderboard()
+        rewards.load()
+    threading.Thread(target=replay, name="rewards-warmup", daemon=True).start()
+
+# Completions and literacy results go to a local outbox first and are synced in
+# batches, so a farmer without signal loses nothing.
+import datetime
+import uuid
+from points_ledger import completion_key
+from sync_queue import LocalSender, Outbox, SyncEngine, forget_applied
+
+def apply_completion(key, p):
+    day = datetime.date.fromisoformat(p["day"])
+    digest, result = recognize_upload(p["files"][0])
+    # ledger row, tasks row and blob reference commit together; a retry after
+    # a later failure finds the row and only picks up the rewards it earned
+    new = ledger.award(p["phone"], p["task"], p["points"], day, event_id=key,
+                       on_new=lambda c: db_add_task(c, p["phone"], p["task"], digest, result))
+    if new:
+        farmer = db_get_farmer(p["phone"])
+        badges = rewards.record(p["phone"], "completion", p["task"], p["points"], day,
+                                farmer.village if farmer else None, event_id=key)
+    else:
+        badges = rewards.counted(key)
+    return {"recognition": result, "new": new, "badges": [b for _, b in badges]}
+
+def apply_literacy(key, p):
+    literacy_engine.save_rows(db_pool, p["phone"], p["level"], p["rows"], p.get("score"))
+    profiles.invalidate(p["phone"])
+    rewards.record(p["phone"], "literacy", event_id=key)
+    return {"level": p["level"]}
+
+outbox = Outbox("outbox")
+# Applied keys are recorded in sync_applied, so a resent item is not applied twice.
+sync = SyncEngine(outbox, LocalSender({"completion": apply_completion, "literacy": apply_literacy}, db_pool))
+SYNC_KEY_DAYS = 30  # outbox items older than this are not expected to be resent
+
 def main(page: ft.Page):
     page.title = "Gaming Food Platform for Sustainable Agriculture"
+    # Each screen is built once per (screen, language[, literacy level]) and
+    # afterwards only shown again, with changed properties patched in place.
+    views = ViewCache(page)
+    sync.start()
+    ctx = sessions.for_page(page, DEFAULT_LANGUAGE)
+    page.on_close = lambda e: sessions.end(page)
+
     # -------- LANGUAGE SELECTION -----------
     def choose_language(e=None):
         def set_lang(ev):
-            global app_language
-            app_language = ev.control.data
-            page.clean()
+            ctx.lang = ev.control.data
             login_screen()
-        page.clean()
-        page.add(ft.Text("🌱 " + t("choose_lang"), size=30))
-        for code, name in LANGUAGES.items():
-            page.add(ft.ElevatedButton(name, data=code, on_click=set_lang, width=200))
+        def build():
+            col = ft.Column([ft.Text("🌱 " + t("choose_lang", ctx), size=30)])
+            for code, name in LANGUAGES.items():
+                col.controls.append(ft.ElevatedButton(name, data=code, on_click=set_lang, width=200))
+            return col
+        views.show(("choose_lang", ctx.lang), build)
 
     # --------- LOGIN / REGISTER ------------
     def login_screen(msg=""):
-        page.clean()
-        phone_field = ft.TextField(label=t("phone"), width=250)
-        pin_field = ft.TextField(label=t("pin"), password=True, can_reveal_password=True, width=250)
-        msg_text = ft.Text(msg, color="red") if msg else None
-        def on_login(e):
-            farmer = db_get_farmer(phone_field.value)
-            if farmer and check_pin(pin_field.value, farmer['pin_hash']):
-                # Store local session, route to literacy/adaptive UI
-                literacy_level = farmer['literacy_lvl']
-                page.client_storage.set("user_phone", farmer['phone'])
-                page.client_storage.set("literacy_lvl", literacy_level)
-                daily_tasks_screen(literacy_level)
-            else:
-                login_screen(msg="Wrong credentials. Try again.")
-
-        page.add(ft.Text("🌾 " + t("login"), size=24))
-        if msg_text: page.add(msg_text)
-        page.add(phone_field, pin_field)
-        page.add(ft.ElevatedButton(t("submit"), on_click=on_login, width=200))
-        page.add(ft.TextButton(t("register"), on_click=lambda e: registration_screen()))
+        def build():
+            phone_field = ft.TextField(label=t("phone", ctx), width=250)
+            pin_field = ft.TextField(label=t("pin", ctx), password=True, can_reveal_password=True, width=250)
+            msg_text = ft.Text("", color="red", visible=False)
+            async def on_login(e):
+                farmer = db_get_farmer(phone_field.value)
+                if farmer and await check_pin(farmer.phone, pin_field.value, farmer.pin_hash):
+                    # Session state lives in ctx; route to literacy/adaptive UI
+                    ctx.phone = farmer.phone
+                    ctx.set_literacy(farmer.literacy_lvl, farmer.literacy_score)
+                    daily_tasks_screen()
+                else:
+                    login_screen(msg="Wrong credentials. Try again.")
+            return ft.Column([
+                ft.Text("🌾 " + t("login", ctx), size=24), msg_text, phone_field, pin_field,
+                ft.ElevatedButton(t("submit", ctx), on_click=on_login, width=200),
+                ft.TextButton(t("register", ctx), on_click=lambda e: registration_screen()),
+            ])
+        def refresh(view):
+            msg_text, pin_field = view.controls[1], view.controls[3]
+            return patch(msg_text, value=msg, visible=bool(msg)) + patch(pin_field, value="")
+        views.show(("login", ctx.lang), build, refresh)
 
     def registration_screen():
-        page.clean()
-        phone_field = ft.TextField(label=t("phone"), width=250)
-        pin_field = ft.TextField(label=t("pin"), password=True, can_reveal_password=True, width=250)
-        lang_field = ft.Dropdown(label=t("choose_lang"), options=[ft.dropdown.Option(v, key=k) for k,v in LANGUAGES.items()])
-        def on_register(e):
-            pin_hash = hash_pin(pin_field.value)
-            db_register_farmer(phone_field.value, pin_hash, lang_field.value, 0)  # Assume low literacy; will update after test
-            login_screen("Registered! Please login.")
-        page.add(ft.Text("🌱 " + t("register"), size=24))
-        page.add(phone_field, pin_field, lang_field)
-        page.add(ft.ElevatedButton(t("submit"), on_click=on_register, width=200))
-        page.add(ft.TextButton(t("login"), on_click=lambda e: login_screen()))
+        def build():
+            phone_field = ft.TextField(label=t("phone", ctx), width=250)
+            pin_field = ft.TextField(label=t("pin", ctx), password=True, can_reveal_password=True, width=250)
+            lang_field = ft.Dropdown(label=t("choose_lang", ctx), options=[ft.dropdown.Option(v, key=k) for k,v in LANGUAGES.items()])
+            async def on_register(e):
+                pin_hash = await hash_pin(pin_field.value)
+                db_register_farmer(phone_field.value, pin_hash, lang_field.value, 0)  # Assume low literacy; will update after test
+                login_screen("Registered! Please login.")
+            return ft.Column([
+                ft.Text("🌱 " + t("register", ctx), size=24), phone_field, pin_field, lang_field,
+                ft.ElevatedButton(t("submit", ctx), on_click=on_register, width=200),
+                ft.TextButton(t("login", ctx), on_click=lambda e: login_screen()),
+            ])
+        def refresh(view):
+            return patch(view.controls[2], value="")  # never show a previous PIN
+        views.show(("register", ctx.lang), build, refresh)
 
     # --------- TECHNICAL LITERACY TEST -------------
+    # Steps, timing limits and level thresholds come from specs/literacy_tests.json.
+    lit_run = [None]  # current LiteracyRun; boxed so the cached step views see new runs
+
     def literacy_test_screen():
-        page.clean()
-        lit_scores = [0,0,0,0]  # [swipe, tap, nav, cam]
-        current_test = [0]  # index; boxed to be mutable
-
-        def test_swipe():
-            page.clean()
-            page.add(ft.Text(t("swipe_test"), size=18))
-            b = ft.ElevatedButton("⬅️", width=100, height=50)
-            def on_swipe(ev):  # You may use on_change for certain gestures, as per Flet's gesture support
-                lit_scores[0] = 1
-                test_tap()
-            b.on_click = on_swipe
-            page.add(b)
-            if get_ui_params(0)["use_voice"]:
-                play_audio(page, t("swipe_test"), app_language)
-        def test_tap():
-            page.clean()
-            page.add(ft.Text(t("tap_test"), size=18))
-            b = ft.ElevatedButton("🖱️", width=100, height=50)
-            def on_tap(ev):
-                lit_scores[1] = 1
-                test_nav()
-            b.on_click = on_tap
-            page.add(b)
-            if get_ui_params(0)["use_voice"]:
-                play_audio(page, t("tap_test"), app_language)
-        def test_nav():
-            page.clean()
-            page.add(ft.Text(t("nav_test"), size=18))
-            b = ft.ElevatedButton("➡️", width=100, height=50)
-            def on_nav(ev):
-                lit_scores[2] = 1
-                test_cam()
-            b.on_click = on_nav
-            page.add(b)
-            if get_ui_params(0)["use_voice"]:
-                play_audio(page, t("nav_test"), app_language)
-        def test_cam():
-            page.clean()
-            page.add(ft.Text(t("cam_test"), size=18))
-            b = ft.IconButton(icon=ft.icons.CAMERA_ALT, icon_size=50)
-            def on_cam(ev):
-                lit_scores[3] = 1
-                show_result()
-            b.on_click = on_cam
-            page.add(b)
-            if get_ui_params(0)["use_voice"]:
-                play_audio(page, t("cam_test"), app_language)
-        def show_result():
-            score = sum(lit_scores)
-            if score < 2:
-                lvl = 0  # Low
-            elif score < 4:
-                lvl = 1  # Med
+        lit_run[0] = LiteracyRun(LITERACY_SUITE)
+        ctx.set_literacy(0)  # assume low literacy (big buttons, voice) until measured
+        test_step(lit_run[0].suite.steps[0])
+
+    def test_step(step):
+        def build():
+            if "icon" in step:
+                b = ft.IconButton(icon=getattr(ft.icons, step["icon"]), icon_size=50)
             else:
-                lvl = 2  # High
-            # Update farmer DB
-            phone = page.client_storage.get("user_phone")
-            with db_connect() as db:
-                c = db.cursor()
-                c.execute("UPDATE farmers SET literacy_lvl=%s WHERE phone=%s", (lvl, phone))
-                db.commit()
-            daily_tasks_screen(lvl)
-        test_swipe()
+                b = ft.ElevatedButton(step["label"], width=100, height=50)
+            def on_click(ev):  # You may use on_change for certain gestures, as per Flet's gesture support
+                run = lit_run[0]
+                run.complete(step["id"])
+                nxt = run.suite.after(step["id"])
+                if nxt:
+                    test_step(nxt)
+                else:
+                    show_result()
+            b.on_click = on_click
+            return ft.Column([ft.Text(t(step["prompt"], ctx), size=18), b])
+        views.show(("literacy", step["id"], ctx.lang), build)
+        lit_run[0].begin(step["id"])
+        if ctx.ui.use_voice:
+            play_audio(ctx, t(step["prompt"], ctx))
+
+    def show_result():
+        # Level plus every step's timing, synced as one item (one transaction)
+        run = lit_run[0]
+        outbox.enqueue("literacy", {"phone": ctx.phone, "level": run.level(), "score": run.score(),
+                                    "rows": run.rows(ctx.phone)}, key=uuid.uuid4().hex)
+        sync.kick()
+        ctx.set_literacy(run.level(), run.score())
+        daily_tasks_screen()
 
     # --------- DAILY TASKS + GAMIFICATION -----------
-    def daily_tasks_screen(lit_level):
-        page.clean()
-        ui = get_ui_params(lit_level)
-        page.add(ft.Text("🌱 " + t("tasks"), size=24))
-        # Sample tasks (should pull from DB or dynamic schedule)
-        tasks = [
-            {"id": 1, "desc": "Water the paddy field", "points": 10},
-            {"id": 2, "desc": "Take a photo of blooming tomatoes", "points": 15}
-        ]
-        done = []
-        # Points, badges; pull actual scores from DB in production
-
-        for task in tasks:
-            task_text = task['desc']
-            btn = ft.ElevatedButton(task_text,
-                                    width=ui["button_size"]*5, height=ui["button_size"]*1.4,
-                                    on_click=lambda e, t=task: task_detail_screen(t, lit_level),
-                                    tooltip=f"{task['points']} points")
-            if ui["use_voice"]:
-                btn.on_hover = lambda e, txt=task_text: play_audio(page, txt, app_language)
-            page.add(btn)
-
-        # Leaderboard and rewards
-        page.add(ft.Text("🏆 Leaderboard: (Coming soon)", size=18))
+    def daily_tasks_screen():
+        farmer = db_get_farmer(ctx.phone)
+        tasks = daily_tasks.describe(ctx.phone, ctx.lang, crop=farmer.crop if farmer else None,
+                                     level=ctx.literacy_lvl)
+        def build():
+            col = ft.Column([ft.Text("🌱 " + t("tasks", ctx), size=ctx.ui.title_size)])
+            for task in tasks:
+                col.controls.append(task_button(ctx, task, lambda e, t=task: task_detail_screen(t)))
+
+            # Leaderboard and rewards
+            col.controls.append(ft.Text(standing(), size=18))
+            return col
+        def refresh(view):
+            return patch(view.controls[-1], value=standing())
+        views.show(("tasks", ctx.lang, ctx.ui, tuple(t["id"] for t in tasks)), build, refresh)
+
+    def standing():
+        score, rank, total = ledger.standing(ctx.phone)
+        if rank is None:
+            return "🏆 Leaderboard: complete a task to get ranked"
+        streak = rewards.summary(ctx.phone)["streak"]
+        return f"🏆 Leaderboard: #{rank} of {total} ({score} points) · 🔥 {t('streak', ctx)}: {streak}"
 
     # --------- TASK DETAIL + IMAGE RECOGNITION -------
-    def task_detail_screen(task, lit_level):
-        page.clean()
-        ui = get_ui_params(lit_level)
-        page.add(ft.Text("🔎 Task: "+task["desc"], size=22))
-        def on_upload(e):
-            uploaded_image = e.files[0]
-            with open(uploaded_image.path, "rb") as f:
-                img_bytes = f.read()
-            result = recognize_image(img_bytes)  # Backend ML call
-            res_text = f"Crop: {result.get('crop_type', 'Unknown')}, Status: {result.get('status', 'Unknown')}"
-            page.snack_bar = ft.SnackBar(content=ft.Text(res_text))
-            page.snack_bar.open = True
-            page.update()
-            # Gamification update
-            # TODO: Save completion, update rewards/points/DB
-            page.add(ft.Text(f"You earned {task['points']} points!", size=18))
-        page.add(ft.FilePicker(on_result=on_upload, file_type=ft.FilePickerFileType.IMAGE))
-        page.add(ft.TextButton("⬅️ Back", on_click=lambda e: daily_tasks_screen(lit_level)))
+    def task_detail_screen(task):
+        def build():
+            earned = ft.Text("", size=18, visible=False)
+            async def on_upload(e):
+                # Queue first (photo, ledger row, badges are applied on sync), then try to send now
+                key = completion_key(ctx.phone, task["id"])
+                outbox.enqueue("completion", {"phone": ctx.phone, "task": task["id"], "points": task["points"],
+                                              "day": datetime.date.today().isoformat()},
+                               key=key, files=[e.files[0].path])
+                # Send only this item now; other sessions' items stay with the background thread
+                done = (await asyncio.to_thread(sync.send_now, [key])).get(key)
+                if done is None:
+                    patch(earned, value="Saved. It will be sent when you are back online.", visible=True)
+                    page.update()
+                    return
+                result = done["recognition"]  # Backend ML call
+                res_text = f"Crop: {result.get('crop_type', 'Unknown')}, Status: {result.get('status', 'Unknown')}"
+                page.snack_bar = ft.SnackBar(content=ft.Text(res_text))
+                page.snack_bar.open = True
+                # Gamification update: ledger row, farmers.score and leaderboard together
+                if done["new"] and not done.get("replayed"):
+                    msg = f"You earned {task['points']} points!"
+                    for badge in done["badges"]:
+                        msg += f"\n🏅 {t('badge_' + badge, ctx)}"
+                    patch(earned, value=msg, visible=True)
+                else:
+                    patch(earned, value="Already completed today.", visible=True)
+                page.update()
+            return ft.Column([
+                ft.Text("🔎 Task: "+task["desc"], size=22),
+                ft.FilePicker(on_result=on_upload, file_type=ft.FilePickerFileType.IMAGE),
+                ft.TextButton("⬅️ Back", on_click=lambda e: daily_tasks_screen()),
+                earned,
+            ])
+        def refresh(view):
+            return patch(view.controls[3], visible=False)  # fresh visit, nothing earned yet
+        views.show(("task", ctx.lang, ctx.ui, task["id"]), build, refresh)
 
     # --------- USER FLOW ----------
     choose_language()
 
-ft.run(main)
\ No newline at end of file
+if __name__ == "__main__":  # process-pool workers re-import this module
+    import sys
+    if "--prewarm" in sys.argv:  # CLI: render the audio cache and exit
+        n = prewarm_audio(wait=True)
+        print(f"Checked {n} clips; cache {audio_cache.stats()}; {speech_queue.latency()}")
+    elif "--schedule-tasks" in sys.argv:  # nightly CLI: write tomorrow's tasks for every farmer
+        migrations.require_current(db_pool)
+        n = task_scheduler.generate_day(db_pool)
+        purged = task_scheduler.purge_before(db_pool, datetime.date.today() - datetime.timedelta(days=TASK_HISTORY_DAYS))
+        forgotten = forget_applied(db_pool, time.time() - SYNC_KEY_DAYS * 86400)
+        print(f"Scheduled {n} tasks; purged {purged} old rows and {forgotten} sync keys")
+    else:
+        migrations.require_current(db_pool)  # no DDL here: run python migrations.py at deploy
+        prewarm_audio()  # renders in the background while the app starts
+        warm_rewards()
+        if START_LOCAL_RECOGNIZER:
+            try:
+                start_local_server(RECOGNITION_PORT)
+            except ImportError:  # no TensorFlow here: use the service at RECOGNITION_PORT
+                print("TensorFlow not installed; using the remote recognition service")
+        ft.run(main)
\ No newline at end of file
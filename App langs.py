@@ -1,45 +1,145 @@
+import datetime
+import os
+import threading
+import uuid
+
 import flet as ft
-import mysql.connector
-from flet_audio import Audio
 from flet_audiorecorder import AudioRecorder
-from gtts import gTTS
-import io
 
 try:
+    import numpy as np
     import tensorflow as tf
     from tensorflow.keras.preprocessing import image as keras_image
     from tensorflow.keras.applications import mobilenet_v2
 except ImportError:
     tf = None
-from PIL import Image
-
-# Manual translation dictionaries (English, Tamil, Hindi)
-strings = {
-    "en": {
-        "login": "Login",
-        "enter_phone": "Enter phone number",
-        "enter_pin": "Enter PIN",
-        "daily_task": "Today's Task:",
-        "camera_upload": "Upload image",
-        "task_completed": "Task completed!"
-    },
-    "ta": {
-        "login": "உள்நுழைய",
-        "enter_phone": "தொலைபேசி எண்",
-        "enter_pin": "PIN கொடுக்கவும்",
-        "daily_task": "இன்றைய பணி:",
-        "camera_upload": "படத்தைப் பதிவேற்றவும்",
-        "task_completed": "பணி முடிந்தது!"
-    },
-    "hi": {
-        "login": "लॉगिन",
-        "enter_phone": "फ़ोन नंबर",
-        "enter_pin": "PIN दर्ज करें",
-        "daily_task": "आज का कार्य:",
-        "camera_upload": "छवि अपलोड करें",
-        "task_completed": "कार्य पूर्ण!"
-    }
+
+import migrations
+import ui_profiles
+from auth_service import AuthService
+from blob_store import BlobStore
+from catalog import catalog
+from farm_repository import FarmRepository
+from farmer_profiles import ProfileCache
+from image_ingest import load_for_model
+from literacy_engine import LiteracyRun, save_rows
+from points_ledger import PointsLedger, completion_key
+from rewards import Rewards
+from speech import PageSpeaker, SpeechCache, gtts_backend, offline_backend
+from sync_queue import LocalSender, Outbox, SyncEngine
+from task_scheduler import DailyTasks
+
+DB_CONFIG = {
+    "user": "your_db_user", "password": "your_db_password",
+    "host": "localhost", "database": "farmers_db",
 }
+# One repository per process; each query borrows its own pooled connection.
+# Tables come from migrations.py (run at deploy), not from session start.
+repo = FarmRepository.for_mysql(DB_CONFIG, pool_size=10)
+# Login reads the farmer's columns through a TTL cache, invalidated on writes.
+profiles = ProfileCache(repo.pool)
+# PINs are stored as bcrypt hashes, hashed and checked off the event loop.
+auth = AuthService()
+# Task photos are stored once per content hash; tasks.image_path holds the digest.
+repo.blobs = blob_store = BlobStore("uploads", repo.pool)
+# Synthesized prompts are shared across sessions; SPEECH_BACKEND=offline skips the network.
+# Today's tasks per farmer (daily_tasks table, generated on first open if the nightly job missed them).
+daily_tasks = DailyTasks(repo.pool)
+# Completions land in the points ledger once per (farmer, day, task), which keeps farmers.score.
+ledger = PointsLedger(repo.pool)
+rewards = Rewards(repo.pool)
+
+
+def warm_rewards():
+    """Replay the ledger into the leaderboard and badges in the background at
+    startup, instead of on the first farmer's tasks screen."""
+    def replay():
+        ledger.load_leaderboard()
+        rewards.load()
+    threading.Thread(target=replay, name="rewards-warmup", daemon=True).start()
+speech_cache = SpeechCache(offline_backend if os.environ.get("SPEECH_BACKEND") == "offline"
+                           else gtts_backend)
+
+# Image recognition model (MobileNet): loaded once per process on first use,
+# and uploads from all sessions are batched into shared predict() calls.
+INFER_MAX_BATCH = 16
+INFER_MAX_WAIT = 0.02  # seconds
+if tf:
+    from model_registry import get_batcher, register_model
+    register_model("mobilenet_v2", lambda: mobilenet_v2.MobileNetV2(weights="imagenet"))
+
+def recognize_image(file_path):
+    if not tf:
+        return None
+    img = load_for_model(file_path, (224, 224))  # draft-mode decode, EXIF dropped
+    arr = mobilenet_v2.preprocess_input(keras_image.img_to_array(img))
+    try:
+        preds = get_batcher("mobilenet_v2", INFER_MAX_BATCH, INFER_MAX_WAIT).submit(arr).result()
+    except Exception:
+        return None  # model unavailable (e.g. weights could not be downloaded)
+    decoded = mobilenet_v2.decode_predictions(preds[np.newaxis, ...], top=1)[0]
+    return decoded[0][1]  # predicted class name
+
+
+# Uploads and literacy results are queued locally and synced in batches, so
+# nothing is lost offline. Handlers run once per item when its batch is sent.
+def apply_photo(key, p):
+    digest = blob_store.put(p["files"][0])
+    identified = blob_store.recognition(digest)  # re-uploads skip inference
+    if identified is None:
+        identified = recognize_image(blob_store.path(digest))
+        if identified:
+            blob_store.set_recognition(digest, identified)
+    if not p["task"]:  # a photo outside today's tasks: history only, no points
+        with repo.pool.connection() as db:
+            repo.write_task(db.cursor(), p["phone"], "DailyTask", digest, identified)
+            db.commit()
+        return {"identified": identified, "new": False, "badges": []}
+    day = datetime.date.fromisoformat(p["day"])
+    event_id = completion_key(p["phone"], p["task"], day)
+    # the tasks row commits with the ledger row; a retry after a later failure
+    # finds the row and only picks up the rewards it earned
+    new = ledger.award(p["phone"], p["task"], p["points"], day, event_id,
+                       on_new=lambda c: repo.write_task(c, p["phone"], p["task"], digest, identified))
+    if new:
+        farmer = profiles.get(p["phone"])
+        badges = rewards.record(p["phone"], "completion", p["task"], p["points"], day,
+                                farmer.village if farmer else None, event_id)
+    else:
+        badges = rewards.counted(event_id)
+    return {"identified": identified, "new": new, "badges": [b for _, b in badges]}
+
+
+def apply_literacy(key, p):
+    save_rows(repo.pool, p["phone"], p["level"], p["rows"], p.get("score"))
+    profiles.invalidate(p["phone"])
+    rewards.record(p["phone"], "literacy", event_id=key)
+    return {"level": p["level"]}
+
+
+# Each handler commits its own rows before the batch's keys are recorded.
+sync = SyncEngine(Outbox("outbox"), LocalSender({"photo": apply_photo, "literacy": apply_literacy}, repo.pool))
+
+
+# Task rows per UI layout (ui_profiles.py): the profile carries the sizes and
+# switches, so one tasks screen serves every literacy level.
+def _big_button_row(ui, text, task, speak):  # icons and voice, no reading needed
+    return ft.ElevatedButton(text["daily_task"], width=ui.task_width, height=ui.task_height,
+                             tooltip=task["desc"], on_click=lambda e, txt=task["desc"]: speak(txt))
+
+
+def _text_row(ui, text, task, speak):
+    label = f"{text['daily_task']} {task['desc']}"
+    if ui.show_points:
+        label += f" ({task['points']} points)"
+    return ft.Row([
+        ft.Text(label, size=ui.text_size),
+        ft.IconButton(ft.icons.MIC, icon_size=ui.icon_size, tooltip="Hear task",
+                      on_click=lambda e, txt=task["desc"]: speak(txt)),
+    ])
+
+
+TASK_ROWS = {"linear": _big_button_row, "grid": _text_row, "advanced": _text_row}
 
 
 def main(page: ft.Page):
@@ -52,66 +152,37 @@ def main(page: ft.Page):
         current_locale=ft.Locale("en"),
     )
 
-    # Connect to MySQL (requires mysql-connector-python)
-    conn = mysql.connector.connect(
-        user='your_db_user', password='your_db_password',
-        host='localhost', database='farmers_db'
-    )
-    cursor = conn.cursor()
-    # Create tables if not exist
-    cursor.execute(""" CREATE TABLE IF NOT EXISTS farmers (  phone VARCHAR(15) PRIMARY KEY,     pin VARCHAR(10),        literacy_level INT,    score INT DEFAULT 0)   """)
-    cursor.execute("""   CREATE TABLE IF NOT EXISTS tasks (id INT AUTO_INCREMENT PRIMARY KEY,      phone VARCHAR(15),        task_name VARCHAR(100),     image_path VARCHAR(255),       recognized VARCHAR(100),       FOREIGN KEY (phone) REFERENCES farmers(phone)   )  """)
-    conn.commit()
+    sync.start()
 
     user_phone = ""
     user_lang = "en"
-    tech_points = 0
+    user_level = 0  # 0-based, as in the task templates
+    user_ui = ui_profiles.resolve()  # UIProfile from the measured literacy score
+    task_views = {}  # (profile, language, task ids) -> controls, built once
+    lit_run = None
 
     # Setup audio recorder for speech input (not fully implemented here)
     recorder = AudioRecorder()
     page.overlay.append(recorder)
 
     # Function to play text via TTS
+    speaker = PageSpeaker(page, speech_cache)
+
     def speak(text):
         lang_code = {"en": "en", "ta": "ta", "hi": "hi"}[user_lang]
-        tts = gTTS(text=text, lang=lang_code)
-        fp = io.BytesIO()
-        tts.write_to_fp(fp)
-        fp.seek(0)
-        audio = Audio(src=fp.read(), autoplay=True)
-        page.overlay.append(audio)
-
-    # Load image recognition model (MobileNet) if possible
-    if tf:
-        try:
-            model = mobilenet_v2.MobileNetV2(weights="imagenet")
-        except:
-            model = None
-
-        def recognize_image(file_path):
-            img = Image.open(file_path).resize((224, 224))
-            arr = keras_image.img_to_array(img)
-            arr = mobilenet_v2.preprocess_input(arr)
-            preds = model.predict(arr[np.newaxis, ...])
-            decoded = mobilenet_v2.decode_predictions(preds, top=1)[0]
-            return decoded[0][1]  # predicted class name
-    else:
-        def recognize_image(file_path):
-            return None
+        speaker.speak(text, lang_code)
 
     # Handle Login button click
-    def login(e):
-        nonlocal user_phone, tech_points
+    async def login(e):
+        nonlocal user_phone
         phone = phone_field.value.strip()
         pin = pin_field.value.strip()
         if phone and pin:
-            cursor.execute("SELECT pin FROM farmers WHERE phone=%s", (phone,))
-            result = cursor.fetchone()
-            if result:
+            farmer = profiles.get(phone)
+            if farmer is not None:
                 # Existing user: check PIN
-                if result[0] == pin:
+                if await auth.check_pin(phone, pin, farmer.pin_hash):
                     user_phone = phone
-                    tech_points = 0
                     show_tests()
                 else:
                     page.snack_bar = ft.SnackBar(ft.Text("Incorrect PIN"))
@@ -119,103 +190,100 @@ def main(page: ft.Page):
                     page.update()
             else:
                 # New user: insert into DB
-                cursor.execute("INSERT INTO farmers (phone, pin) VALUES (%s, %s)", (phone, pin))
-                conn.commit()
+                repo.add_farmer(phone, await auth.hash_pin(pin), user_lang)
+                profiles.invalidate(phone)
                 user_phone = phone
-                tech_points = 0
                 show_tests()
 
     # Show technical-literacy test(s)
     def show_tests():
+        nonlocal lit_run
+        lit_run = LiteracyRun("quick")  # steps and thresholds: specs/literacy_tests.json
+        show_test_step(lit_run.suite.steps[0])
+
+    def show_test_step(step):
         page.clean()
         page.add(ft.Text("Technical Literacy Test", size=20))
-        # Example test: Tap the button
-        test_label = ft.Text("Tap the green button below", size=16)
-        tap_button = ft.ElevatedButton("Tap me", bgcolor=ft.colors.GREEN,
-                                       on_click=lambda e: complete_test(1))
+        test_label = ft.Text(step["prompt"], size=16)
+        tap_button = ft.ElevatedButton(step["label"], bgcolor=ft.colors.GREEN,
+                                       on_click=lambda e: complete_test(step["id"]))
         page.add(test_label, tap_button)
         page.update()
+        lit_run.begin(step["id"])
 
-    def complete_test(points):
-        nonlocal tech_points
-        tech_points += points
-        determine_literacy()
-
-    def determine_literacy():
-        page.clean()
-        # Simple thresholds for low/med/high literacy
-        if tech_points < 2:
-            level = 1  # low
-        elif tech_points < 4:
-            level = 2  # medium
-        else:
-            level = 3  # high
-        # Update DB
-        cursor.execute("UPDATE farmers SET literacy_level=%s WHERE phone=%s", (level, user_phone))
-        conn.commit()
-        if level == 1:
-            show_low_ui()
-        elif level == 2:
-            show_medium_ui()
+    def complete_test(step_id):
+        lit_run.complete(step_id)
+        nxt = lit_run.suite.after(step_id)
+        if nxt:
+            show_test_step(nxt)
         else:
-            show_high_ui()
+            determine_literacy()
 
-    # Low-literacy UI: big buttons, icons, voice
-    def show_low_ui():
-        page.clean()
-        page.add(ft.Text("Welcome (Low Literacy)", size=24))
-        # Large button for task, voice on click
-        task_btn = ft.ElevatedButton(
-            strings[user_lang]["daily_task"], width=250, height=100,
-            on_click=lambda e: speak("This is your daily task.")
-        )
-        upload_btn = ft.ElevatedButton(
-            strings[user_lang]["camera_upload"], width=250, height=100,
-            on_click=lambda e: file_picker.pick_files(allow_multiple=False)
-        )
-        page.add(task_btn, upload_btn, file_picker)
-        page.update()
+    def todays_tasks():
+        farmer = profiles.get(user_phone)
+        return daily_tasks.describe(user_phone, user_lang, crop=farmer.crop if farmer else None, level=user_level)
 
-    # Medium-literacy UI: some text + icons
-    def show_medium_ui():
-        page.clean()
-        page.add(ft.Text("Welcome (Medium Literacy)", size=24))
-        page.add(ft.Text(strings[user_lang]["daily_task"] + " Check soil moisture."))
-        mic_btn = ft.IconButton(
-            ft.icons.MIC, tooltip="Hear task",
-            on_click=lambda e: speak("Check soil moisture and upload a photo.")
-        )
-        page.add(mic_btn, file_picker)
-        page.update()
+    def determine_literacy():
+        nonlocal user_level, user_ui
+        user_level = lit_run.level()  # 0 (low) .. 2 (high), stored as farmers.literacy_lvl
+        user_ui = ui_profiles.resolve(lit_run.score(), user_level)
+        # Update DB: level, score and per-step results in one transaction, via the outbox
+        sync.outbox.enqueue("literacy", {"phone": user_phone, "level": user_level, "score": lit_run.score(),
+                                         "rows": lit_run.rows(user_phone)}, key=uuid.uuid4().hex)
+        sync.kick()
+        show_tasks_ui()
 
-    # High-literacy UI: full text, calendar
-    def show_high_ui():
+    def show_tasks_ui():
+        tasks = todays_tasks()
+        key = (user_ui, user_lang, tuple(task["id"] for task in tasks))
+        controls = task_views.get(key)
+        if controls is None:
+            ui, text = user_ui, catalog.bundle(user_lang)
+            row = TASK_ROWS[ui.layout]
+            controls = task_views[key] = [
+                ft.Text(f"Welcome ({ui.id})", size=ui.title_size),
+                *(row(ui, text, task, speak) for task in tasks),
+                ft.ElevatedButton(text["camera_upload"], width=ui.task_width, height=ui.task_height,
+                                  on_click=lambda e: file_picker.pick_files(allow_multiple=False)),
+                file_picker,
+            ]
+            if ui.calendar:
+                controls.append(ft.Calendar())
         page.clean()
-        page.add(ft.Text("Welcome (High Literacy)", size=24))
-        page.add(ft.Text(strings[user_lang]["daily_task"] + " Identify the weed species."))
-        mic_btn = ft.IconButton(
-            ft.icons.MIC, tooltip="Hear task",
-            on_click=lambda e: speak("Identify the weed in the photo and upload its image.")
-        )
-        page.add(mic_btn, file_picker)
-        # Calendar for extra info
-        cal = ft.Calendar()
-        page.add(cal)
+        page.add(*controls)
         page.update()
 
     # Handle file uploads from the file picker
     def on_file_result(e: ft.FilePickerResultEvent):
+        day = datetime.date.today()
+        # each photo credits the next of today's tasks not yet done, keyed as
+        # the ledger keys it: one completion per (farmer, day, task)
+        todo = {completion_key(user_phone, task["id"], day): task for task in todays_tasks()}
+        done = set()
+        if todo:  # synced, or still queued in the outbox
+            done = ledger.recorded(todo) | {key for key, _, _ in sync.outbox.get(todo)}
+        todo = [(key, task) for key, task in todo.items() if key not in done]
+        keys, credited = [], {}
         for file in e.files:
-            path = file.path
-            identified = recognize_image(path) if tf and model else None
-            cursor.execute(
-                "INSERT INTO tasks (phone, task_name, image_path, recognized) VALUES (%s, %s, %s, %s)",
-                (user_phone, "DailyTask", path, identified)
-            )
-            conn.commit()
-            msg = strings[user_lang]["task_completed"]
-            if identified:
-                msg += f" Recognized: {identified}"
+            key, task = todo.pop(0) if todo else (uuid.uuid4().hex, {"id": None, "points": 0})
+            keys.append(key)
+            credited[key] = task
+            sync.outbox.enqueue("photo", {"phone": user_phone, "task": task["id"], "points": task["points"],
+                                          "day": day.isoformat()},
+                                key=key, files=[file.path])
+        results = sync.send_now(keys)  # just this pick; the rest of the queue stays in the background
+        for key in dict.fromkeys(keys):
+            done = results.get(key)
+            if done is None:
+                msg = catalog.bundle(user_lang)["task_completed"] + " (saved offline, will sync)"
+            else:
+                msg = catalog.bundle(user_lang)["task_completed"]
+                if done["new"] and not done.get("replayed"):
+                    msg += f" +{credited[key]['points']} points"
+                for badge in done["badges"]:
+                    msg += " 🏅 " + catalog.bundle(user_lang)["badge_" + badge]
+                if done["identified"]:
+                    msg += f" Recognized: {done['identified']}"
             page.snack_bar = ft.SnackBar(ft.Text(msg))
             page.snack_bar.open = True
             page.update()
@@ -241,10 +309,13 @@ def main(page: ft.Page):
             value="en",
             on_change=change_language
         ),
-        ft.TextField(label=strings[user_lang]["enter_phone"], width=300),
-        ft.TextField(label=strings[user_lang]["enter_pin"], width=300, password=True),
-        ft.ElevatedButton(strings[user_lang]["login"], on_click=login)
+        ft.TextField(label=catalog.bundle(user_lang)["enter_phone"], width=300),
+        ft.TextField(label=catalog.bundle(user_lang)["enter_pin"], width=300, password=True),
+        ft.ElevatedButton(catalog.bundle(user_lang)["login"], on_click=login)
     )
 
 
-ft.app(target=main)
\ No newline at end of file
+if __name__ == "__main__":  # bcrypt pool workers re-import this module
+    migrations.require_current(repo.pool)  # no DDL here: run python migrations.py at deploy
+    warm_rewards()
+    ft.app(target=main)
@@ -1,5 +1,11 @@
 import flet as ft
 
+from gestures import SwipeTracker, UpdateCoalescer
+from interaction_metrics import InteractionMetrics
+from literacy_engine import LiteracyRun
+import ui_profiles
+from view_router import ViewRouter
+
 
 def main(page: ft.Page):
     page.title = "Farmer Tech Literacy Test"
@@ -8,116 +14,155 @@ def main(page: ft.Page):
     page.vertical_alignment = ft.MainAxisAlignment.CENTER
     page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
 
+    metrics = InteractionMetrics()  # taps, navigation and swipes for the literacy score
+    run = LiteracyRun("router")     # per-step timing and level, see specs/literacy_tests.json
+    saved = [False]
+
+    def enter_test(route):
+        step = run.suite.by_route.get(route)
+        if step:
+            run.begin(step["id"])
+
+    def next_test(step_id, route):
+        run.complete(step_id)
+        page.go(route)
+
+    def finish_test():
+        # One write with everything measured, once the last test is passed
+        run.complete("swipe")
+        if not saved[0]:
+            report = metrics.report(swipe_tracker.summary())
+            score = (run.score() + report["score"]) / 2  # step points and interaction quality
+            report.update(points=run.points(), level=run.level(),
+                          steps={k: round(v[1], 2) for k, v in run.results.items()},
+                          ui_profile=ui_profiles.resolve(score, run.level()).id)
+            page.client_storage.set("literacy_metrics", report)
+            saved[0] = True
+
     ##################
     # CLICK TEST
     ##################
-    click_count = ft.Text(value="Click Count: 0", size=20)
-
-    def click_handler(e):
-        count = int(click_count.value.split(": ")[1]) + 1
-        click_count.value = f"Click Count: {count}"
-        page.update()
-
-    click_btn = ft.ElevatedButton("Click Me!", width=200, on_click=click_handler)
-
-    def go_to_audio(e):
-        page.go("/audio")
-
-    click_test_view = ft.Column(
-        controls=[
-            ft.Text("Clicking Test", size=25, weight=ft.FontWeight.BOLD),
-            ft.Text("Tap the button as accurately as you can."),
-            click_btn,
-            click_count,
-            ft.ElevatedButton("Next Test", on_click=go_to_audio)
-        ],
-        alignment=ft.MainAxisAlignment.CENTER,
-        horizontal_alignment=ft.CrossAxisAlignment.CENTER
-    )
+    # Each test is built on first visit and kept alive by the router.
+    def click_test_view():
+        click_count = ft.Text(value="Click Count: 0", size=20)
+
+        def click_handler(e):
+            click_count.value = f"Click Count: {metrics.record('click')}"
+            click_count.update()
+
+        click_btn = ft.ElevatedButton("Click Me!", width=200, on_click=click_handler)
+
+        def go_to_audio(e):
+            next_test("click", "/audio")
+
+        return ft.Column(
+            controls=[
+                ft.Text("Clicking Test", size=25, weight=ft.FontWeight.BOLD),
+                ft.Text("Tap the button as accurately as you can."),
+                click_btn,
+                click_count,
+                ft.ElevatedButton("Next Test", on_click=go_to_audio)
+            ],
+            alignment=ft.MainAxisAlignment.CENTER,
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER
+        )
 
     ##################
     # AUDIO INSTRUCTION TEST (No Audio widget)
     ##################
     def go_to_navigate(e):
-        page.go("/navigate")
-
-    audio_test_view = ft.Column(
-        controls=[
-            ft.Text("Audio Instruction Test", size=25, weight=ft.FontWeight.BOLD),
-            ft.Text("Listen to the instruction and follow it."),
-            ft.Text("Audio playback is not supported in Flet. Please play the instruction.mp3 file manually."),
-            ft.ElevatedButton("Next Test", on_click=go_to_navigate)
-        ],
-        alignment=ft.MainAxisAlignment.CENTER,
-        horizontal_alignment=ft.CrossAxisAlignment.CENTER
-    )
+        next_test("audio", "/navigate")
+
+    def audio_test_view():
+        return ft.Column(
+            controls=[
+                ft.Text("Audio Instruction Test", size=25, weight=ft.FontWeight.BOLD),
+                ft.Text("Listen to the instruction and follow it."),
+                ft.Text("Audio playback is not supported in Flet. Please play the instruction.mp3 file manually."),
+                ft.ElevatedButton("Next Test", on_click=go_to_navigate)
+            ],
+            alignment=ft.MainAxisAlignment.CENTER,
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER
+        )
 
     ##################
     # NAVIGATION TEST
     ##################
     def go_to_swipe(e):
-        page.go("/swipe")
-
-    navigation_test_view = ft.Column(
-        controls=[
-            ft.Text("Navigation Test", size=25, weight=ft.FontWeight.BOLD),
-            ft.Text("Tap the button below to go to the next test."),
-            ft.ElevatedButton("Go to Next Test", on_click=go_to_swipe)
-        ],
-        alignment=ft.MainAxisAlignment.CENTER,
-        horizontal_alignment=ft.CrossAxisAlignment.CENTER
-    )
+        metrics.record("nav")
+        next_test("navigate", "/swipe")
+
+    def navigation_test_view():
+        return ft.Column(
+            controls=[
+                ft.Text("Navigation Test", size=25, weight=ft.FontWeight.BOLD),
+                ft.Text("Tap the button below to go to the next test."),
+                ft.ElevatedButton("Go to Next Test", on_click=go_to_swipe)
+            ],
+            alignment=ft.MainAxisAlignment.CENTER,
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER
+        )
 
     ##################
     # SWIPE TEST
     ##################
-    swipe_status = ft.Text("Swipe left or right", size=20)
-
-    def on_swipe(e: ft.DragUpdateEvent):
-        if e.delta_x < -10:
-            swipe_status.value = "Swiped Left!"
-        elif e.delta_x > 10:
-            swipe_status.value = "Swiped Right!"
-        page.update()
-
-    swipe_container = ft.GestureDetector(
-        content=ft.Container(
-            content=swipe_status,
-            width=300,
-            height=200,
-            bgcolor="#FFECB3",  # Amber 100 hex value
-            border_radius=10,
-            alignment="center",  # <-- this is the fix!
-        ),
-        on_horizontal_drag_update=on_swipe
-    )
-
-    swipe_test_view = ft.Column(
-        controls=[
-            ft.Text("Swipe Test", size=25, weight=ft.FontWeight.BOLD),
-            swipe_container,
-            ft.Text("Try swiping the box left or right.")
-        ],
-        alignment=ft.MainAxisAlignment.CENTER,
-        horizontal_alignment=ft.CrossAxisAlignment.CENTER
-    )
+    swipe_tracker = SwipeTracker()  # swipe velocity/accuracy, a literacy signal
+
+    def swipe_test_view():
+        swipe_status = ft.Text("Swipe left or right", size=20)
+        ui = UpdateCoalescer()
+
+        def on_swipe_start(e: ft.DragStartEvent):
+            swipe_tracker.start()
+
+        def on_swipe(e: ft.DragUpdateEvent):
+            # Only accumulate; the UI hears about it once the hint actually changes
+            swipe_tracker.update(e.delta_x)
+            hint = swipe_tracker.direction()
+            if hint:
+                ui.set(swipe_status, value=f"Swiping {hint}...")
+
+        def on_swipe_end(e: ft.DragEndEvent):
+            direction = swipe_tracker.end()
+            if direction:
+                metrics.record("swipe")
+                finish_test()
+            ui.set(swipe_status, value=f"Swiped {direction.title()}!" if direction else "Swipe left or right")
+            ui.flush(force=True)
+
+        swipe_container = ft.GestureDetector(
+            content=ft.Container(
+                content=swipe_status,
+                width=300,
+                height=200,
+                bgcolor="#FFECB3",  # Amber 100 hex value
+                border_radius=10,
+                alignment="center",  # <-- this is the fix!
+            ),
+            on_horizontal_drag_start=on_swipe_start,
+            on_horizontal_drag_update=on_swipe,
+            on_horizontal_drag_end=on_swipe_end,
+        )
+
+        return ft.Column(
+            controls=[
+                ft.Text("Swipe Test", size=25, weight=ft.FontWeight.BOLD),
+                swipe_container,
+                ft.Text("Try swiping the box left or right.")
+            ],
+            alignment=ft.MainAxisAlignment.CENTER,
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER
+        )
 
     ##################
     # ROUTING
     ##################
-    def route_change(e):
-        page.views.clear()
-        if page.route == "/":
-            page.views.append(ft.View("/", [click_test_view]))
-        elif page.route == "/audio":
-            page.views.append(ft.View("/audio", [audio_test_view]))
-        elif page.route == "/navigate":
-            page.views.append(ft.View("/navigate", [navigation_test_view]))
-        elif page.route == "/swipe":
-            page.views.append(ft.View("/swipe", [swipe_test_view]))
-        page.update()
-
-    page.on_route_change = route_change
+    ViewRouter(page, {
+        "/": lambda: [click_test_view()],
+        "/audio": lambda: [audio_test_view()],
+        "/navigate": lambda: [navigation_test_view()],
+        "/swipe": lambda: [swipe_test_view()],
+    }, on_enter=enter_test)
     page.go(page.route or "/")
 
 
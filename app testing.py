@@ -1,7 +1,9 @@
 import flet as ft
 
-# Available languages
-LANGUAGES = ["English", "Español", "Français", "Deutsch", "العربية"]
+from catalog import catalog
+
+# Available languages (display names from the shared catalog)
+LANGUAGES = list(catalog.languages().values())
 
 def main(page: ft.Page):
     page.title = "Language & Login App"
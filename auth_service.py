@@ -0,0 +1,107 @@
+# auth_service.py
+# bcrypt hashing off the UI event loop: work runs in a bounded process pool and
+# recently verified PINs are remembered for a short while.
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = 12       # cost factor for new hashes
+SESSION_TTL = 15 * 60    # seconds a verified login skips rehashing
+# The pool starts on the first login, when the app already runs TTS, sync and
+# HTTP threads; forking a threaded process can deadlock, so workers come from
+# a fresh forkserver (spawn where that is unavailable) instead.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _hash(pin, rounds):
+    return bcrypt.hashpw(pin.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def _check(pin, pin_hash):
+    return bcrypt.checkpw(pin.encode(), pin_hash.encode())
+
+
+class AuthService:
+    def __init__(self, workers=None, rounds=BCRYPT_ROUNDS, session_ttl=SESSION_TTL):
+        self.workers = workers or os.cpu_count() or 1
+        self.rounds = rounds
+        self.session_ttl = session_ttl
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._verified = {}  # digest of (phone, pin, hash) -> expiry
+        self.cache_hits = 0
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context(START_METHOD))
+            return self._pool
+
+    def _key(self, phone, pin, pin_hash):
+        # Never keep the PIN itself; a changed hash invalidates the entry.
+        return hashlib.sha256(f"{phone}\0{pin}\0{pin_hash}".encode()).digest()
+
+    async def hash_pin(self, pin):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), _hash, pin, self.rounds)
+
+    def hash_pins(self, pins):
+        """Blocking bulk hash across every worker, in input order (for imports)."""
+        pins = list(pins)
+        chunk = max(1, len(pins) // (4 * self.workers))
+        return list(self._executor().map(_hash, pins, [self.rounds] * len(pins), chunksize=chunk))
+
+    async def check_pin(self, phone, pin, pin_hash):
+        key = self._key(phone, pin, pin_hash)
+        now = time.monotonic()
+        if self._verified.get(key, 0) > now:
+            self.cache_hits += 1
+            return True
+        loop = asyncio.get_running_loop()
+        ok = await loop.run_in_executor(self._executor(), _check, pin, pin_hash)
+        if ok:
+            self._verified[key] = now + self.session_ttl
+            if len(self._verified) > 10000:
+                self._purge(now)
+        return ok
+
+    def forget(self):
+        """Drop all cached logins, e.g. after PIN changes."""
+        self._verified.clear()
+
+    def _purge(self, now):
+        for k in [k for k, exp in self._verified.items() if exp <= now]:
+            del self._verified[k]
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+if __name__ == "__main__":
+    # Logins/sec as the pool grows: python auth_service.py
+    LOGINS = 64
+    stored = _hash("4321", 10)
+
+    async def run(workers):
+        auth = AuthService(workers=workers, rounds=10)
+        await auth.check_pin("warmup", "4321", stored)
+        start = time.perf_counter()
+        await asyncio.gather(*(auth.check_pin(str(i), "4321", stored) for i in range(LOGINS)))
+        took = time.perf_counter() - start
+        auth.shutdown()
+        return LOGINS / took
+
+    n = 1
+    while n <= (os.cpu_count() or 1):
+        print(f"{n:3d} workers: {asyncio.run(run(n)):8.1f} logins/s")
+        n *= 2
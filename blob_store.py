@@ -0,0 +1,114 @@
+# blob_store.py
+# Write-once, content-addressed storage for task photos. Files live at
+# <root>/ab/cd/<sha256>; the blobs table holds a reference count per digest
+# (one per tasks row pointing at it) and the cached recognition result.
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    def __init__(self, root, pool, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.pool = pool
+        self.chunk_size = chunk_size
+        self._tmp = os.path.join(root, "tmp")
+        os.makedirs(self._tmp, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    # ---- write ----
+    def put(self, src_path):
+        """Stream a file in, hashing as we go; returns its SHA-256 digest."""
+        h = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with open(src_path, "rb") as src, os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: src.read(self.chunk_size), b""):
+                    h.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            digest = h.hexdigest()
+            dest = self.path(digest)
+            if not os.path.exists(dest):  # write-once: never overwrite a blob
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        with self.pool.connection() as db:
+            db.cursor().execute(self.pool.sql(
+                "INSERT IGNORE INTO blobs (digest, size, refcount, created_at) VALUES (%s, %s, 0, %s)"),
+                (digest, size, time.time()))
+            # A re-upload of an unreferenced blob restarts its gc() grace period,
+            # so it survives until the tasks row that references it is written.
+            db.cursor().execute(self.pool.sql(
+                "UPDATE blobs SET created_at=%s WHERE digest=%s AND refcount=0"), (time.time(), digest))
+            db.commit()
+        return digest
+
+    def open(self, digest):
+        return open(self.path(digest), "rb")
+
+    # ---- references (bumped by FarmRepository.flush_tasks / write_task) ----
+    def add_refs(self, cursor, digests):
+        cursor.executemany(self.pool.sql("UPDATE blobs SET refcount=refcount+1 WHERE digest=%s"),
+                           [(d,) for d in digests])
+
+    # ---- recognition cache ----
+    def recognition(self, digest):
+        with self.pool.connection() as db:
+            c = db.cursor()
+            c.execute(self.pool.sql("SELECT recognition FROM blobs WHERE digest=%s"), (digest,))
+            row = c.fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def set_recognition(self, digest, result):
+        with self.pool.connection() as db:
+            db.cursor().execute(self.pool.sql("UPDATE blobs SET recognition=%s WHERE digest=%s"),
+                                (json.dumps(result), digest))
+            db.commit()
+
+    # ---- garbage collection ----
+    def gc(self, grace=24 * 3600):
+        """Recount refs from tasks, then delete unreferenced blobs older than `grace` s."""
+        cutoff = time.time() - grace
+        with self.pool.connection() as db:
+            c = db.cursor()
+            c.execute("UPDATE blobs SET refcount=(SELECT COUNT(*) FROM tasks WHERE tasks.image_path=blobs.digest)")
+            c.execute(self.pool.sql("SELECT digest FROM blobs WHERE refcount=0 AND created_at<%s"), (cutoff,))
+            dead = [row[0] for row in c.fetchall()]
+            c.executemany(self.pool.sql("DELETE FROM blobs WHERE digest=%s AND refcount=0"),
+                          [(d,) for d in dead])
+            db.commit()
+        for digest in dead:
+            try:
+                os.remove(self.path(digest))
+            except OSError:
+                pass
+        return len(dead)
+
+
+if __name__ == "__main__":
+    # Round trip on an sqlite stand-in: python blob_store.py
+    from db_pool import sqlite_pool
+    from migrations import migrate
+
+    root = tempfile.mkdtemp()
+    pool = sqlite_pool(os.path.join(root, "farm.db"))
+    store = BlobStore(os.path.join(root, "blobs"), pool)
+    migrate(pool)
+    photo = os.path.join(root, "photo.jpg")
+    with open(photo, "wb") as f:
+        f.write(os.urandom(3 * CHUNK_SIZE + 17))
+    a, b = store.put(photo), store.put(photo)
+    assert a == b and os.path.exists(store.path(a))
+    store.set_recognition(a, "corn")
+    print("dedup ok, cached recognition:", store.recognition(a))
+    print("gc removed:", store.gc(grace=0), "exists:", os.path.exists(store.path(a)))
@@ -0,0 +1,154 @@
+# catalog.py
+# Shared message catalog for all apps. Sources are locales/<lang>.json; they are
+# compiled to gettext .mo files (python catalog.py compile, or automatically on
+# first use when a .mo is missing or stale) and each language is loaded only
+# when first asked for. locales/index.json names the languages and their
+# fallback chains.
+import gettext
+import json
+import os
+import struct
+import threading
+from types import MappingProxyType
+
+LOCALE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+
+
+def write_mo(messages, path):
+    """Write {key: text} as a GNU .mo file (no hash table)."""
+    items = sorted({"": "Content-Type: text/plain; charset=UTF-8\n", **messages}.items())
+    keys = [k.encode() for k, _ in items]
+    vals = [v.encode() for _, v in items]
+    n = len(items)
+    key_start = 7 * 4 + 16 * n
+    val_start = key_start + sum(len(k) + 1 for k in keys)
+    out = [struct.pack("<7I", 0x950412DE, 0, n, 28, 28 + 8 * n, 0, 0)]
+    offset = key_start
+    for k in keys:
+        out.append(struct.pack("<2I", len(k), offset))
+        offset += len(k) + 1
+    offset = val_start
+    for v in vals:
+        out.append(struct.pack("<2I", len(v), offset))
+        offset += len(v) + 1
+    out += [k + b"\0" for k in keys] + [v + b"\0" for v in vals]
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(out))
+    os.replace(tmp, path)
+
+
+class Catalog:
+    def __init__(self, directory=LOCALE_DIR, default="en"):
+        self.directory = directory
+        self.default = default
+        with open(os.path.join(directory, "index.json"), encoding="utf-8") as f:
+            self.index = json.load(f)
+        self._translations = {}
+        self._bundles = {}
+        self._lock = threading.RLock()  # translation() recurses into fallbacks
+
+    def languages(self):
+        """{code: display name}, in index order."""
+        return {code: meta["name"] for code, meta in self.index.items()}
+
+    def compile(self, lang, force=False):
+        src = os.path.join(self.directory, f"{lang}.json")
+        mo = os.path.join(self.directory, f"{lang}.mo")
+        if not os.path.exists(src):  # deployed with compiled catalogs only
+            return mo
+        if force or not os.path.exists(mo) or os.path.getmtime(mo) < os.path.getmtime(src):
+            with open(src, encoding="utf-8") as f:
+                write_mo(json.load(f), mo)
+        return mo
+
+    def translation(self, lang):
+        """Lazily load a language's .mo with its fallback chain attached."""
+        tr = self._translations.get(lang)
+        if tr is None:
+            with self._lock:
+                tr = self._translations.get(lang)
+                if tr is None:
+                    with open(self.compile(lang), "rb") as f:
+                        tr = gettext.GNUTranslations(f)
+                    for fb in self.index[lang].get("fallback", []):
+                        tr.add_fallback(self.translation(fb))
+                    self._translations[lang] = tr
+        return tr
+
+    def get(self, lang, key):
+        if lang not in self.index:
+            lang = self.default
+        return self.translation(lang).gettext(key)
+
+    def bundle(self, lang):
+        """Every key resolved for `lang` (fallbacks applied), built once; read-only."""
+        b = self._bundles.get(lang)
+        if b is None:
+            if lang not in self.index:
+                return self.bundle(self.default)
+            tr = self.translation(lang)
+            keys = set()
+            node = tr
+            while node is not None:  # the loaded .mo chain, not the JSON sources
+                keys.update(k for k in node._catalog if isinstance(k, str) and k)
+                node = node._fallback
+            b = self._bundles[lang] = MappingProxyType({k: tr.gettext(k) for k in keys})
+        return b
+
+
+catalog = Catalog()
+
+
+if __name__ == "__main__":
+    # python catalog.py compile   -> (re)build every .mo
+    # python catalog.py bench     -> startup time/memory vs number of languages
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+
+    if sys.argv[1:2] == ["compile"]:
+        for code in catalog.index:
+            print("compiled", catalog.compile(code, force=True))
+        sys.exit()
+
+    with open(os.path.join(LOCALE_DIR, "en.json"), encoding="utf-8") as f:
+        base = json.load(f)
+    base = {f"{k}_{i}": f"{v} {i}" for i in range(40) for k, v in base.items()}  # ~700 keys
+    for n in (3, 10, 30, 100):
+        d = tempfile.mkdtemp()
+        index = {f"l{i}": {"name": f"Lang {i}", "fallback": ["l0"] if i else []} for i in range(n)}
+        with open(os.path.join(d, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        for code in index:
+            with open(os.path.join(d, f"{code}.json"), "w", encoding="utf-8") as f:
+                json.dump({k: f"{code}:{v}" for k, v in base.items()}, f)
+            Catalog(d).compile(code)
+
+        def eager():  # what module-level literals cost: every language, up front
+            out = {}
+            for code in index:
+                with open(os.path.join(d, f"{code}.json"), encoding="utf-8") as f:
+                    out[code] = json.load(f)
+            return out
+
+        def lazy():  # a session only pays for its own language (+ fallback)
+            cat = Catalog(d)
+            cat.get("l1", "login_0")
+            return cat
+
+        def measure(load):
+            t0 = time.perf_counter()
+            load()
+            took = time.perf_counter() - t0
+            tracemalloc.start()
+            kept = load()
+            mem = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del kept
+            return took, mem
+
+        (eager_s, eager_mem), (lazy_s, lazy_mem) = measure(eager), measure(lazy)
+        print(f"{n:3d} languages: eager {1000 * eager_s:7.1f} ms {eager_mem / 1e6:6.2f} MB | "
+              f"lazy {1000 * lazy_s:6.1f} ms {lazy_mem / 1e6:5.2f} MB")
@@ -0,0 +1,214 @@
+# db_pool.py
+# Small connection pool shared by the Flet apps. Connections are created by a
+# factory, so the same pool works with mysql.connector or an sqlite3 stand-in.
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PoolStats:
+    """Running counters for the pool; read via ConnectionPool.metrics()."""
+    def __init__(self):
+        self.checkouts = 0
+        self.created = 0
+        self.evicted = 0
+        self.failed_health_checks = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class ConnectionPool:
+    def __init__(self, factory, size=5, max_idle=300.0, health_check=True,
+                 timeout=10.0, paramstyle="format"):
+        self.factory = factory
+        self.size = size
+        self.max_idle = max_idle          # seconds an idle conn may live
+        self.health_check = health_check
+        self.timeout = timeout            # seconds to wait for a free conn
+        self.paramstyle = paramstyle      # "format" (%s) or "qmark" (?)
+        self._idle = queue.LifoQueue()    # (conn, returned_at)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self.stats = PoolStats()
+
+    # ---- checkout / checkin ----
+    def acquire(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"no connection free after {self.timeout}s")
+        try:
+            conn = self._take_idle() or self._new()
+        except Exception:
+            self._slots.release()
+            raise
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._in_use += 1
+            self.stats.checkouts += 1
+            self.stats.total_wait += waited
+            self.stats.max_wait = max(self.stats.max_wait, waited)
+        return conn
+
+    def release(self, conn, broken=False):
+        with self._lock:
+            self._in_use -= 1
+        try:
+            if broken:
+                _close(conn)
+            else:
+                _rollback(conn)  # never hand out a half-open transaction
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            broken = not self._alive(conn)
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def _take_idle(self):
+        now = time.monotonic()
+        while True:
+            try:
+                conn, since = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if self.max_idle is not None and now - since > self.max_idle:
+                _close(conn)
+                self.stats.evicted += 1
+                continue
+            if self.health_check and not self._alive(conn):
+                _close(conn)
+                self.stats.failed_health_checks += 1
+                continue
+            return conn
+
+    def _new(self):
+        conn = self.factory()
+        with self._lock:
+            self.stats.created += 1
+        return conn
+
+    def _alive(self, conn):
+        try:
+            if hasattr(conn, "ping"):  # mysql.connector
+                conn.ping(reconnect=False)
+            else:
+                c = conn.cursor()
+                c.execute("SELECT 1")
+                c.fetchall()
+                c.close()
+            return True
+        except Exception:
+            return False
+
+    # ---- maintenance ----
+    def evict_idle(self):
+        """Close idle connections older than max_idle. Returns how many."""
+        if self.max_idle is None:
+            return 0
+        keep, dropped, now = [], 0, time.monotonic()
+        while True:
+            try:
+                conn, since = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if now - since > self.max_idle:
+                _close(conn)
+                dropped += 1
+            else:
+                keep.append((conn, since))
+        for item in reversed(keep):
+            self._idle.put(item)
+        self.stats.evicted += dropped
+        return dropped
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _close(conn)
+
+    def sql(self, query):
+        """Rewrite a MySQL-style query (%s, INSERT IGNORE) for the pool's driver."""
+        if self.paramstyle == "qmark":
+            return query.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+        return query
+
+    def metrics(self):
+        s = self.stats
+        return {
+            "size": self.size,
+            "in_use": self._in_use,
+            "idle": self._idle.qsize(),
+            "checkouts": s.checkouts,
+            "created": s.created,
+            "evicted": s.evicted,
+            "failed_health_checks": s.failed_health_checks,
+            "avg_wait_ms": 1000 * s.total_wait / s.checkouts if s.checkouts else 0.0,
+            "max_wait_ms": 1000 * s.max_wait,
+        }
+
+
+def _rollback(conn):
+    try:
+        conn.rollback()
+    except Exception:
+        pass
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def mysql_pool(db_config, size=5, **kw):
+    import mysql.connector
+    return ConnectionPool(lambda: mysql.connector.connect(**db_config), size=size,
+                          paramstyle="format", **kw)
+
+
+def sqlite_pool(path, size=5, **kw):
+    """Stand-in for local testing; each pooled conn may hop threads."""
+    import sqlite3
+    return ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False),
+                          size=size, paramstyle="qmark", **kw)
+
+
+if __name__ == "__main__":
+    # Quick check against sqlite: python db_pool.py
+    import os
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = os.path.join(tempfile.mkdtemp(), "pool.db")
+    pool = sqlite_pool(path, size=4)
+    with pool.connection() as db:
+        db.execute("CREATE TABLE farmers (phone TEXT PRIMARY KEY, literacy_lvl INT)")
+        db.commit()
+
+    def work(i):
+        with pool.connection() as db:
+            db.execute(pool.sql("INSERT INTO farmers VALUES (%s, %s)"), (str(i), i % 3))
+            db.commit()
+
+    with ThreadPoolExecutor(16) as ex:
+        list(ex.map(work, range(2000)))
+    print(pool.metrics())
@@ -0,0 +1,162 @@
+# farm_repository.py
+# Data access for the farmers/tasks tables (created by migrations.py). Every
+# call borrows its own pooled connection, so concurrent Flet sessions never
+# share a cursor.
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from db_pool import mysql_pool
+
+INSERT_TASK = ("INSERT INTO tasks (phone, task_name, image_path, recognized, completed_at) "
+               "VALUES (%s, %s, %s, %s, %s)")
+
+
+class FarmRepository:
+    def __init__(self, pool, task_batch_size=50, flush_interval=2.0, blobs=None):
+        self.pool = pool
+        self.blobs = blobs  # BlobStore whose refcounts follow tasks.image_path
+        self.task_batch_size = task_batch_size
+        self.flush_interval = flush_interval  # seconds; None = only explicit flush
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flusher = None
+        # conn -> {query: prepared cursor}; statements are prepared once per
+        # pooled connection and dropped with it
+        self._prepared = weakref.WeakKeyDictionary()
+        self._prepared_lock = threading.Lock()
+
+    @classmethod
+    def for_mysql(cls, db_config, pool_size=10, **kw):
+        return cls(mysql_pool(db_config, size=pool_size), **kw)
+
+    @contextmanager
+    def _cursor(self, db, query):
+        # Server-side prepared statements on MySQL, one cursor per (connection,
+        # query) so each statement is prepared once; sqlite caches its own.
+        if self.pool.paramstyle != "format":
+            c = db.cursor()
+            try:
+                yield c
+            finally:
+                c.close()
+            return
+        with self._prepared_lock:
+            cursors = self._prepared.setdefault(db, {})
+        c = cursors.get(query)  # a pooled conn is used by one thread at a time
+        if c is None:
+            c = cursors[query] = db.cursor(prepared=True)
+        yield c
+
+    def _run(self, query, params=(), fetch=False, many=False):
+        with self.pool.connection() as db, self._cursor(db, query) as c:
+            q = self.pool.sql(query)
+            if many:
+                c.executemany(q, params)
+            else:
+                c.execute(q, params)
+            if fetch:
+                rows = c.fetchall()  # leave nothing unread on a reused cursor
+                return rows[0] if rows else None
+            db.commit()
+
+    # ---- farmers ----
+    def get_pin_hash(self, phone):
+        row = self._run("SELECT pin_hash FROM farmers WHERE phone=%s", (phone,), fetch=True)
+        return row[0] if row else None
+
+    def add_farmer(self, phone, pin_hash, language="en", literacy_lvl=0):
+        self._run("INSERT INTO farmers (phone, pin_hash, language, literacy_lvl, created_at) "
+                  "VALUES (%s, %s, %s, %s, %s)", (phone, pin_hash, language, literacy_lvl, time.time()))
+
+    # ---- tasks ----
+    def write_task(self, cursor, phone, task_name, image_path, recognized):
+        """Write one task row (and its blob reference) on the caller's cursor,
+        e.g. inside PointsLedger.award's transaction."""
+        cursor.execute(self.pool.sql(INSERT_TASK), (phone, task_name, image_path, recognized, time.time()))
+        if self.blobs is not None and image_path:
+            self.blobs.add_refs(cursor, [image_path])
+
+    # ---- tasks (batched) ----
+    def add_task(self, phone, task_name, image_path, recognized):
+        """Queue a task row; rows are written together by flush_tasks()."""
+        with self._pending_lock:
+            self._pending.append((phone, task_name, image_path, recognized, time.time()))
+            full = len(self._pending) >= self.task_batch_size
+        if full:
+            self.flush_tasks()
+        else:
+            self._schedule_flush()
+
+    def flush_tasks(self):
+        """Write queued task rows in one transaction; on failure they are queued again."""
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if rows:
+            try:
+                with self.pool.connection() as db:
+                    # Plain cursor: mysql-connector sends a prepared executemany
+                    # one row per round trip instead of one multi-row INSERT.
+                    c = db.cursor()
+                    c.executemany(self.pool.sql(INSERT_TASK), rows)
+                    if self.blobs is not None:
+                        self.blobs.add_refs(c, [r[2] for r in rows if r[2]])
+                    db.commit()
+                    c.close()
+            except Exception:
+                with self._pending_lock:
+                    self._pending[:0] = rows
+                raise
+        return len(rows)
+
+    def _timed_flush(self):
+        try:
+            self.flush_tasks()
+        except Exception:
+            with self._pending_lock:
+                self._flusher = None
+            self._schedule_flush()  # rows were put back; try again later
+            raise
+
+    def _schedule_flush(self):
+        if self.flush_interval is None:
+            return
+        with self._pending_lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Timer(self.flush_interval, self._timed_flush)
+            self._flusher.daemon = True
+            self._flusher.start()
+
+
+if __name__ == "__main__":
+    # Load test on an sqlite stand-in: python farm_repository.py
+    import os
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from db_pool import sqlite_pool
+    from literacy_engine import LiteracyRun, save_results
+    from migrations import migrate
+
+    SESSIONS = 400
+
+    def session(repo, i):
+        phone = f"9{i:09d}"
+        if repo.get_pin_hash(phone) is None:
+            repo.add_farmer(phone, "$2b$04$" + "x" * 53)  # hashing is measured in auth_service.py
+        run = LiteracyRun("quick")
+        run.complete("tap")
+        save_results(repo.pool, phone, run)
+        repo.add_task(phone, "DailyTask", f"/tmp/{i}.jpg", None)
+
+    for workers in (1, 2, 4, 8):
+        path = os.path.join(tempfile.mkdtemp(), "farm.db")
+        repo = FarmRepository(sqlite_pool(path, size=workers), flush_interval=None)
+        migrate(repo.pool)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(workers) as ex:
+            list(ex.map(lambda i: session(repo, i), range(SESSIONS)))
+        repo.flush_tasks()
+        took = time.perf_counter() - start
+        print(f"{workers} workers: {SESSIONS / took:8.1f} sessions/s  {repo.pool.metrics()}")
@@ -0,0 +1,189 @@
+# farmer_import.py
+# Bulk onboarding from a spreadsheet export:
+#   python farmer_import.py village.csv [--sqlite farm.db]
+# The CSV needs phone and pin columns; language and literacy_lvl are optional.
+# Rows are streamed in chunks: phones already registered are skipped before
+# any hashing, PINs are bcrypt-hashed across all cores, and each chunk is one
+# multi-row INSERT IGNORE and one commit, overlapping the next chunk's hashing.
+import csv
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import catalog
+
+CHUNK_SIZE = 500
+PHONE_RE = re.compile(r"^\+?\d{10,14}$")
+PIN_RE = re.compile(r"^\d{4,6}$")
+LITERACY_LEVELS = range(3)  # farmers.literacy_lvl: 0 (low) .. 2 (high)
+
+INSERT_FARMER = ("INSERT IGNORE INTO farmers (phone, pin_hash, language, literacy_lvl, created_at) "
+                 "VALUES (%s, %s, %s, %s, %s)")
+
+
+class ImportReport:
+    def __init__(self):
+        self.read = 0
+        self.invalid = 0
+        self.duplicate = 0     # repeated within the file
+        self.existing = 0      # already registered (or raced in during the import)
+        self.inserted = 0
+        self.seconds = 0.0
+        self.errors = []       # (line, reason), first 100 only
+
+    def rows_per_sec(self):
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.read} rows in {self.seconds:.1f}s ({self.rows_per_sec():,.0f} rows/s): "
+                f"{self.inserted} inserted, {self.existing} already registered, "
+                f"{self.duplicate} duplicate in file, {self.invalid} invalid")
+
+
+def _clean(row, line, report, seen):
+    phone = (row.get("phone") or "").strip()
+    pin = (row.get("pin") or "").strip()
+    lang = (row.get("language") or "").strip() or catalog.default
+    level = (row.get("literacy_lvl") or "0").strip()
+    reason = None
+    if not PHONE_RE.match(phone):
+        reason = "bad phone"
+    elif not PIN_RE.match(pin):
+        reason = "bad pin"
+    elif lang not in catalog.index:
+        reason = f"unknown language {lang!r}"
+    elif not level.isdigit() or int(level) not in LITERACY_LEVELS:
+        reason = "bad literacy_lvl"
+    if reason:
+        report.invalid += 1
+        if len(report.errors) < 100:
+            report.errors.append((line, reason))
+        return None
+    if phone in seen:
+        report.duplicate += 1
+        return None
+    seen.add(phone)
+    return phone, pin, lang, int(level)
+
+
+def _existing(pool, phones):
+    with pool.connection() as db:
+        c = db.cursor()
+        c.execute(pool.sql(f"SELECT phone FROM farmers WHERE phone IN ({', '.join(['%s'] * len(phones))})"),
+                  phones)
+        return {row[0] for row in c.fetchall()}
+
+
+def _insert(pool, rows):
+    with pool.connection() as db:
+        c = db.cursor()
+        c.executemany(pool.sql(INSERT_FARMER), rows)
+        db.commit()
+        return c.rowcount
+
+
+def import_rows(pool, auth, rows, chunk_size=CHUNK_SIZE, report=None):
+    """Register dict rows (phone, pin[, language, literacy_lvl]); returns an ImportReport."""
+    report = report or ImportReport()
+    start = time.perf_counter()
+    seen = set()
+    writer = ThreadPoolExecutor(max_workers=1)
+    pending = None
+
+    def flush(chunk):
+        nonlocal pending
+        if not chunk:
+            return
+        known = _existing(pool, [r[0] for r in chunk])  # never hash a PIN we won't store
+        chunk = [r for r in chunk if r[0] not in known]
+        if not chunk:  # all registered already; executemany([]) leaves rowcount at -1 on mysql
+            return
+        hashes = auth.hash_pins(r[1] for r in chunk)  # the slow part, on every core
+        if pending is not None:
+            report.inserted += pending.result()
+        now = time.time()
+        pending = writer.submit(_insert, pool, [(r[0], h, r[2], r[3], now) for r, h in zip(chunk, hashes)])
+
+    chunk = []
+    try:
+        for line, row in enumerate(rows, start=2):  # line 1 is the header
+            report.read += 1
+            clean = _clean(row, line, report, seen)
+            if clean:
+                chunk.append(clean)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        flush(chunk)
+        if pending is not None:
+            report.inserted += pending.result()
+    finally:
+        writer.shutdown()
+    report.existing = report.read - report.invalid - report.duplicate - report.inserted
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def import_csv(pool, auth, path, chunk_size=CHUNK_SIZE):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return import_rows(pool, auth, csv.DictReader(f), chunk_size)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+
+    from auth_service import BCRYPT_ROUNDS, AuthService
+    from db_pool import mysql_pool, sqlite_pool
+    from migrations import migrate
+
+    ap = argparse.ArgumentParser(description="Register farmers in bulk from a CSV file")
+    ap.add_argument("csv", nargs="?", help="CSV with phone,pin[,language,literacy_lvl]")
+    ap.add_argument("--sqlite", help="import into this sqlite file instead of MySQL")
+    ap.add_argument("--host", default="localhost")
+    ap.add_argument("--user", default="db_user")
+    ap.add_argument("--password", default="root")
+    ap.add_argument("--database", default="farming_db")
+    ap.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    ap.add_argument("--workers", type=int, default=None, help="hashing processes (default: one per core)")
+    ap.add_argument("--rounds", type=int, default=BCRYPT_ROUNDS)
+    ap.add_argument("--bench", type=int, metavar="N",
+                    help="compare one-by-one registration with the bulk path on N generated rows (sqlite)")
+    args = ap.parse_args()
+    auth = AuthService(workers=args.workers, rounds=args.rounds)
+
+    if args.bench:
+        import random
+        rows = [{"phone": f"9{i:09d}", "pin": f"{random.randrange(10000):04d}", "language": "ta"}
+                for i in range(args.bench)]
+        rows += rows[: args.bench // 20]  # re-sent rows from a second sheet
+        pool = sqlite_pool(os.path.join(tempfile.mkdtemp(), "one.db"), size=1)
+        migrate(pool)
+        import bcrypt
+        start = time.perf_counter()
+        for r in rows:  # what registration_screen does per farmer
+            h = bcrypt.hashpw(r["pin"].encode(), bcrypt.gensalt(args.rounds)).decode()
+            with pool.connection() as db:
+                db.execute("INSERT OR IGNORE INTO farmers (phone, pin_hash, language) VALUES (?, ?, ?)",
+                           (r["phone"], h, r["language"]))
+                db.commit()
+        took = time.perf_counter() - start
+        print(f"one by one: {len(rows)} rows in {took:.1f}s ({len(rows) / took:,.0f} rows/s)")
+
+        pool = sqlite_pool(os.path.join(tempfile.mkdtemp(), "bulk.db"), size=2)
+        migrate(pool)
+        print(f"bulk:       {import_rows(pool, auth, rows, args.chunk)}")
+    else:
+        if not args.csv:
+            ap.error("a CSV file is required")
+        if args.sqlite:
+            pool = sqlite_pool(args.sqlite, size=2)
+        else:
+            pool = mysql_pool({"host": args.host, "user": args.user, "password": args.password,
+                               "database": args.database}, size=2)
+        report = import_csv(pool, auth, args.csv, args.chunk)
+        print(report)
+        for line, reason in report.errors:
+            print(f"  line {line}: {reason}")
+    auth.shutdown()
@@ -0,0 +1,129 @@
+# farmer_profiles.py
+# Read-through cache of the farmer columns the screens need. Login and every
+# screen render read from here; the row is fetched once per TTL (or after an
+# explicit invalidate on registration / literacy update) instead of a
+# SELECT * per login.
+import threading
+import time
+from collections import OrderedDict
+
+PROFILE_COLUMNS = ("phone", "pin_hash", "language", "literacy_lvl", "literacy_score", "crop", "village")
+SELECT_PROFILE = f"SELECT {', '.join(PROFILE_COLUMNS)} FROM farmers WHERE phone=%s"
+
+
+class FarmerProfile:
+    __slots__ = PROFILE_COLUMNS
+
+    def __init__(self, phone, pin_hash, language, literacy_lvl, literacy_score, crop, village):
+        self.phone = phone
+        self.pin_hash = pin_hash
+        self.language = language or "en"
+        self.literacy_lvl = literacy_lvl or 0
+        self.literacy_score = literacy_score   # None if tested before scores were stored
+        self.crop = crop
+        self.village = village
+
+
+_MISSING = object()  # cached "no such farmer", kept for neg_ttl only
+
+
+class ProfileCache:
+    def __init__(self, pool, ttl=300.0, neg_ttl=30.0, max_entries=50000):
+        self.pool = pool
+        self.ttl = ttl              # seconds a profile is trusted without a DB read
+        self.neg_ttl = neg_ttl      # seconds an unknown phone is remembered
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # phone -> (profile or _MISSING, expires)
+        self._generation = {}       # phone -> invalidations seen, for reads racing a write
+        self._resets = 0            # times _generation was cleared to bound its size
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, phone, now=None):
+        """The farmer's profile, or None if not registered."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._data.get(phone)
+            if entry is not None and entry[1] > now:
+                self._data.move_to_end(phone)
+                self.hits += 1
+                return None if entry[0] is _MISSING else entry[0]
+            self.misses += 1
+            generation = (self._generation.get(phone, 0), self._resets)
+        with self.pool.connection() as db:
+            c = db.cursor()
+            c.execute(self.pool.sql(SELECT_PROFILE), (phone,))
+            row = c.fetchone()
+        profile = FarmerProfile(*row) if row else None
+        with self._lock:
+            if (self._generation.get(phone, 0), self._resets) != generation:
+                return profile  # invalidated while reading: the row may predate the write
+            self._data[phone] = (profile or _MISSING, now + (self.ttl if profile else self.neg_ttl))
+            self._data.move_to_end(phone)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return profile
+
+    def invalidate(self, phone):
+        """Call after writing the farmer's row (registration, literacy level, crop...)."""
+        with self._lock:
+            self._data.pop(phone, None)
+            self._generation[phone] = self._generation.get(phone, 0) + 1
+            if len(self._generation) > self.max_entries:
+                self._generation = {}  # reads in flight across a reset are not cached
+                self._resets += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self._data), "hits": self.hits, "db_reads": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None}
+
+
+if __name__ == "__main__":
+    # DB reads per session with and without the cache: python farmer_profiles.py
+    import os
+    import random
+    import tempfile
+    from db_pool import sqlite_pool
+    from migrations import migrate
+
+    FARMERS, SESSIONS = 20_000, 5_000
+    pool = sqlite_pool(os.path.join(tempfile.mkdtemp(), "profiles.db"), size=1)
+    migrate(pool)
+    with pool.connection() as db:
+        db.executemany("INSERT INTO farmers (phone, pin_hash, language, literacy_lvl, crop, village) "
+                       "VALUES (?, ?, ?, ?, ?, ?)",
+                       [(f"9{i:09d}", "$2b$12$" + "x" * 53, "ta", i % 3, "rice", f"v{i % 200}")
+                        for i in range(FARMERS)])
+        db.commit()
+    active = [f"9{random.randrange(FARMERS):09d}" for _ in range(2000)]  # a day's active farmers
+
+    def session(get, invalidate, phone, rnd):
+        get(phone)                      # login
+        for _ in range(rnd.randrange(3, 12)):
+            get(phone)                  # screen renders: language, level, crop, village
+        if rnd.random() < 0.1:          # took the literacy test
+            with pool.connection() as db:
+                db.execute("UPDATE farmers SET literacy_lvl=? WHERE phone=?", (rnd.randrange(3), phone))
+                db.commit()
+            invalidate(phone)
+            get(phone)
+
+    reads = [0]
+
+    def select_star(phone):  # what db_get_farmer did on every call
+        reads[0] += 1
+        with pool.connection() as db:
+            return db.execute("SELECT * FROM farmers WHERE phone=?", (phone,)).fetchone()
+
+    cache = ProfileCache(pool)
+    for name, get, invalidate, count in (
+            ("SELECT * per use", select_star, lambda p: None, lambda: reads[0]),
+            ("profile cache", cache.get, cache.invalidate, lambda: cache.misses)):
+        rnd = random.Random(1)
+        start = time.perf_counter()
+        for i in range(SESSIONS):
+            session(get, invalidate, active[i % len(active)], rnd)
+        took = time.perf_counter() - start
+        print(f"{name:17s}: {count() / SESSIONS:5.2f} DB reads/session, {1e6 * took / SESSIONS:7.1f} us/session")
+    print(cache.stats())
@@ -0,0 +1,115 @@
+# gestures.py
+# Swipe handling for the literacy tests: drag deltas are accumulated locally,
+# the swipe is classified once when the drag ends, and control updates are
+# coalesced to a frame budget and skipped when nothing changed.
+import time
+
+from view_cache import patch
+
+SWIPE_MIN_DISTANCE = 40  # logical pixels of net horizontal travel
+FRAME_BUDGET = 1 / 15    # at most one UI push per this many seconds while dragging
+
+
+class SwipeTracker:
+    """Accumulates one drag at a time and records per-swipe signals."""
+    def __init__(self, min_distance=SWIPE_MIN_DISTANCE):
+        self.min_distance = min_distance
+        self.swipes = []  # (direction or None, velocity px/s, accuracy 0..1)
+        self._reset()
+
+    def _reset(self):
+        self.dx = 0.0
+        self.path = 0.0
+        self.started = None
+
+    def start(self, now=None):
+        self._reset()
+        self.started = time.monotonic() if now is None else now
+
+    def update(self, delta_x, now=None):
+        if self.started is None:
+            self.start(now)
+        self.dx += delta_x
+        self.path += abs(delta_x)
+
+    def direction(self):
+        if self.dx <= -self.min_distance:
+            return "left"
+        if self.dx >= self.min_distance:
+            return "right"
+        return None
+
+    def end(self, now=None):
+        """Classify the finished drag; returns 'left', 'right' or None."""
+        now = time.monotonic() if now is None else now
+        duration = max(now - (self.started or now), 1e-3)
+        direction = self.direction()
+        velocity = abs(self.dx) / duration
+        accuracy = abs(self.dx) / self.path if self.path else 0.0  # 1.0 = no back-and-forth
+        self.swipes.append((direction, velocity, accuracy))
+        self._reset()
+        return direction
+
+    def summary(self):
+        done = [s for s in self.swipes if s[0]]
+        return {
+            "attempts": len(self.swipes),
+            "recognized": len(done),
+            "avg_velocity": sum(s[1] for s in done) / len(done) if done else 0.0,
+            "avg_accuracy": sum(s[2] for s in done) / len(done) if done else 0.0,
+        }
+
+
+class UpdateCoalescer:
+    """Batches control.update() calls to at most one flush per frame budget."""
+    def __init__(self, frame_budget=FRAME_BUDGET):
+        self.frame_budget = frame_budget
+        self._dirty = []
+        self._last = 0.0
+        self.updates = 0
+
+    def set(self, control, now=None, **props):
+        if patch(control, **props) and control not in self._dirty:
+            self._dirty.append(control)
+        self.flush(now=now)
+
+    def flush(self, force=False, now=None):
+        now = time.monotonic() if now is None else now
+        if self._dirty and (force or now - self._last >= self.frame_budget):
+            for control in self._dirty:
+                control.update()
+                self.updates += 1
+            self._dirty.clear()
+            self._last = now
+
+
+if __name__ == "__main__":
+    # Synthetic drags, update counts before/after: python gestures.py
+    import random
+
+    class _Text:
+        def __init__(self, value):
+            self.value = value
+        def update(self):
+            pass
+
+    random.seed(1)
+    SWIPES, EVENTS, HZ = 200, 30, 60  # 30 drag events at 60 Hz per swipe
+    old_updates = SWIPES * EVENTS     # old on_swipe: page.update() per event
+    status, tracker, ui = _Text("Swipe left or right"), SwipeTracker(), UpdateCoalescer()
+    t = 0.0
+    for _ in range(SWIPES):
+        sign = random.choice((-1, 1))
+        tracker.start(t)
+        for _ in range(EVENTS):
+            t += 1 / HZ
+            tracker.update(sign * random.uniform(-1, 6), t)
+            hint = tracker.direction()
+            if hint:
+                ui.set(status, now=t, value=f"Swiping {hint}...")
+        direction = tracker.end(t)
+        ui.set(status, now=t, value=f"Swiped {direction.title()}!" if direction else "Try again")
+        ui.flush(force=True, now=t)
+        t += 0.5
+    print(f"updates: before {old_updates}, after {ui.updates}")
+    print("signals:", tracker.summary())
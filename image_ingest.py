@@ -0,0 +1,55 @@
+# image_ingest.py
+# Upload ingest: decode phone photos at reduced scale (JPEG draft mode), resize
+# to the model input size and drop EXIF, so no stage holds a 5-12 MB photo in
+# memory at once. Originals are streamed into blob_store.BlobStore.
+import io
+import os
+
+from PIL import Image, ImageOps
+
+MODEL_SIZE = (224, 224)
+
+
+def load_for_model(src, size=MODEL_SIZE):
+    """Open a path or file object and return an RGB image of exactly `size`."""
+    img = Image.open(src)
+    # JPEG decoders can scale by 1/2, 1/4 or 1/8 while decoding; ask for the
+    # smallest scale that still covers the target (no-op for other formats).
+    img.draft("RGB", size)
+    img = ImageOps.exif_transpose(img)  # apply orientation before EXIF is dropped
+    return img.convert("RGB").resize(size)
+
+
+def reduce_image(src, size=MODEL_SIZE, quality=85):
+    """Model-sized JPEG bytes with no EXIF/GPS metadata."""
+    buf = io.BytesIO()
+    load_for_model(src, size).save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+if __name__ == "__main__":
+    # Peak RSS per upload, naive vs reduce_image: python image_ingest.py
+    import resource
+    import subprocess
+    import sys
+    import tempfile
+
+    if len(sys.argv) == 3:  # child: run one mode and print peak RSS (KiB)
+        mode, photo = sys.argv[1:]
+        if mode == "naive":
+            with open(photo, "rb") as f:
+                data = f.read()
+            Image.open(io.BytesIO(data)).resize(MODEL_SIZE)
+        else:
+            reduce_image(photo)
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        sys.exit()
+
+    photo = os.path.join(tempfile.mkdtemp(), "photo.jpg")
+    Image.effect_noise((4000, 3000), 64).convert("RGB").save(photo, quality=95)
+    print(f"test photo: {os.path.getsize(photo) / 1e6:.1f} MB, 4000x3000")
+    base = int(subprocess.check_output([sys.executable, "-c",
+        "import resource, PIL.Image; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"]))
+    for mode in ("naive", "reduce"):
+        peak = int(subprocess.check_output([sys.executable, __file__, mode, photo]))
+        print(f"{mode:7s}: peak RSS {peak / 1024:.1f} MiB (+{(peak - base) / 1024:.1f} MiB over import)")
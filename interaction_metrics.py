@@ -0,0 +1,56 @@
+# interaction_metrics.py
+# Counters and tap timing for the literacy tests, held in compact arrays so the
+# UI renders from numbers instead of parsing its own labels back.
+import time
+from array import array
+
+EVENTS = ("click", "nav", "swipe")
+
+
+class InteractionMetrics:
+    def __init__(self):
+        self.counts = array("I", bytes(4 * len(EVENTS)))  # one uint per EVENTS entry
+        self.tap_times = array("d")                       # monotonic seconds per click
+        self.started = time.monotonic()
+
+    def record(self, event, now=None):
+        """Count one event; clicks also keep their timestamp. Returns the new count."""
+        i = EVENTS.index(event)
+        self.counts[i] += 1
+        if event == "click":
+            self.tap_times.append(time.monotonic() if now is None else now)
+        return self.counts[i]
+
+    def count(self, event):
+        return self.counts[EVENTS.index(event)]
+
+    def inter_tap(self):
+        t = self.tap_times
+        return array("d", (t[i] - t[i - 1] for i in range(1, len(t))))
+
+    def median_inter_tap(self):
+        gaps = sorted(self.inter_tap())
+        return gaps[len(gaps) // 2] if gaps else None
+
+    def score(self, swipe_summary=None):
+        """0..1: quick, steady taps, completed navigation and clean swipes score higher."""
+        parts = []
+        gap = self.median_inter_tap()
+        if gap is not None:
+            parts.append(min(1.0, max(0.0, (1.5 - gap) / 1.2)))  # <=0.3 s -> 1, >=1.5 s -> 0
+        parts.append(1.0 if self.count("nav") else 0.0)
+        if swipe_summary and swipe_summary["attempts"]:
+            hit_rate = swipe_summary["recognized"] / swipe_summary["attempts"]
+            parts.append(hit_rate * swipe_summary["avg_accuracy"])
+        return sum(parts) / len(parts)
+
+    def report(self, swipe_summary=None):
+        """Everything the test measured, as one record for a single write."""
+        gap = self.median_inter_tap()
+        return {
+            **{e: self.count(e) for e in EVENTS},
+            "median_inter_tap_ms": round(1000 * gap) if gap is not None else None,
+            "duration_s": round(time.monotonic() - self.started, 1),
+            "swipes": swipe_summary,
+            "score": round(self.score(swipe_summary), 3),
+        }
@@ -0,0 +1,150 @@
+# literacy_engine.py
+# One data-driven technical-literacy test used by every app entry point. Suites
+# are declared in specs/literacy_tests.json (or a .yaml file if PyYAML is
+# installed); each run times its steps, scores them against the suite's
+# thresholds, and all results are written in a single transaction. Tables are
+# created by migrations.py.
+import bisect
+import json
+import os
+import time
+from functools import lru_cache
+
+DEFAULT_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "specs", "literacy_tests.json")
+
+class Suite:
+    def __init__(self, name, spec):
+        self.name = name
+        self.steps = spec["steps"]
+        self.thresholds = sorted(spec.get("thresholds", []))  # points needed for level 1, 2, ...
+        self.slow_factor = spec.get("slow_factor", 1.0)       # multiplier past time_limit_s
+        self.max_points = sum(s.get("points", 1) for s in self.steps)
+        self._index = {s["id"]: i for i, s in enumerate(self.steps)}
+        self.by_route = {s["route"]: s for s in self.steps if "route" in s}
+
+    def step(self, step_id):
+        return self.steps[self._index[step_id]]
+
+    def after(self, step_id):
+        i = self._index[step_id] + 1
+        return self.steps[i] if i < len(self.steps) else None
+
+    def level(self, points):
+        return bisect.bisect_right(self.thresholds, points)
+
+
+@lru_cache(maxsize=None)
+def load_spec(path=DEFAULT_SPEC):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_suite(name, path=DEFAULT_SPEC):
+    return Suite(name, load_spec(path)["suites"][name])
+
+
+class LiteracyRun:
+    """One person's pass through a suite."""
+    def __init__(self, suite):
+        self.suite = suite if isinstance(suite, Suite) else get_suite(suite)
+        self.results = {}   # step id -> (passed, seconds, points)
+        self._began = {}
+
+    def begin(self, step_id, now=None):
+        self._began.setdefault(step_id, time.monotonic() if now is None else now)
+
+    def complete(self, step_id, passed=True, now=None):
+        """Score a step once; later calls for the same step are ignored."""
+        if step_id in self.results:
+            return self.results[step_id][2]
+        now = time.monotonic() if now is None else now
+        seconds = now - self._began.get(step_id, now)
+        step = self.suite.step(step_id)
+        points = step.get("points", 1) if passed else 0
+        limit = step.get("time_limit_s")
+        if limit is not None and seconds > limit:
+            points *= self.suite.slow_factor
+        self.results[step_id] = (passed, seconds, points)
+        return points
+
+    def points(self):
+        return sum(r[2] for r in self.results.values())
+
+    def level(self):
+        return self.suite.level(self.points())
+
+    def score(self):
+        """0..1 share of the suite's points; picks the UI profile (ui_profiles.py)."""
+        return self.points() / self.suite.max_points if self.suite.max_points else 0.0
+
+    def finished(self):
+        return len(self.results) == len(self.suite.steps)
+
+    def rows(self, phone, taken_at=None):
+        taken_at = time.time() if taken_at is None else taken_at
+        return [(phone, step_id, int(passed), seconds, points, taken_at)
+                for step_id, (passed, seconds, points) in self.results.items()]
+
+
+def save_results(pool, phone, run, level=None):
+    """Store every step and the farmer's level in one transaction; returns the level."""
+    level = run.level() if level is None else level
+    return save_rows(pool, phone, level, run.rows(phone), run.score())
+
+
+def save_rows(pool, phone, level, rows, score=None):
+    """save_results() for rows taken earlier, e.g. replayed from the offline outbox.
+    Saving the same run again replaces its rows rather than adding to them."""
+    with pool.connection() as db:
+        c = db.cursor()
+        c.execute(pool.sql("UPDATE farmers SET literacy_lvl=%s, literacy_score=%s WHERE phone=%s"),
+                  (level, score, phone))
+        c.executemany(pool.sql("DELETE FROM literacy_results WHERE phone=%s AND taken_at=%s"),
+                      [(phone, taken_at) for taken_at in {r[5] for r in rows}])
+        c.executemany(pool.sql("INSERT INTO literacy_results (phone, step, passed, seconds, points, taken_at) "
+                               "VALUES (%s, %s, %s, %s, %s, %s)"), [tuple(r) for r in rows])
+        db.commit()
+    return level
+
+
+if __name__ == "__main__":
+    # Per-statement commits vs one transaction per run: python literacy_engine.py
+    import tempfile
+    from db_pool import sqlite_pool
+    from migrations import migrate
+
+    RUNS = 500
+    pool = sqlite_pool(os.path.join(tempfile.mkdtemp(), "lit.db"), size=1)
+    migrate(pool)
+    with pool.connection() as db:
+        db.executemany("INSERT INTO farmers (phone) VALUES (?)", [(str(i),) for i in range(RUNS)])
+        db.commit()
+
+    def make_run(i):
+        run = LiteracyRun("farmer")
+        for n, step in enumerate(run.suite.steps):
+            run.begin(step["id"], now=n)
+            run.complete(step["id"], passed=(i + n) % 3 != 0, now=n + 5)
+        return run
+
+    start = time.perf_counter()
+    for i in range(RUNS):
+        run = make_run(i)
+        with pool.connection() as db:
+            for row in run.rows(str(i)):
+                db.execute("INSERT INTO literacy_results VALUES (?, ?, ?, ?, ?, ?)", row)
+                db.commit()
+            db.execute("UPDATE farmers SET literacy_lvl=?, literacy_score=? WHERE phone=?",
+                       (run.level(), run.score(), str(i)))
+            db.commit()
+    per_stmt = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(RUNS):
+        save_results(pool, str(i), make_run(i))
+    batched = time.perf_counter() - start
+    print(f"{RUNS} runs: per-statement commits {per_stmt:.2f}s, one transaction {batched:.2f}s")
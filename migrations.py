@@ -0,0 +1,255 @@
+# migrations.py
+# Versioned schema for the shared database, the one place tables and indexes
+# are defined. Run once per deploy:
+#   python migrations.py [--sqlite farm.db]
+# The apps only check the recorded version at startup (require_current), so a
+# session start never issues DDL.
+import datetime
+import time
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    def register(step):
+        MIGRATIONS.append((version, name, step))
+        return step
+    return register
+
+
+def _ddl(pool, statement):
+    if pool.paramstyle == "qmark":  # sqlite spelling
+        statement = statement.replace("PRIMARY KEY AUTO_INCREMENT", "PRIMARY KEY AUTOINCREMENT")
+    return statement
+
+
+def _index_exists(pool, cursor, table, name):
+    if pool.paramstyle == "qmark":
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (name,))
+    else:
+        cursor.execute("SELECT 1 FROM information_schema.statistics WHERE table_schema=DATABASE() "
+                       "AND table_name=%s AND index_name=%s", (table, name))
+    return bool(cursor.fetchall())
+
+
+def _table_exists(pool, cursor, table):
+    if pool.paramstyle == "qmark":
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    else:
+        cursor.execute("SELECT 1 FROM information_schema.tables WHERE table_schema=DATABASE() "
+                       "AND table_name=%s", (table,))
+    return bool(cursor.fetchall())
+
+
+def _columns(cursor, table):
+    cursor.execute(f"SELECT * FROM {table} WHERE 1=0")
+    cursor.fetchall()
+    return {d[0].lower() for d in cursor.description}
+
+
+@migration(1, "unified schema")
+def _unified_schema(pool, c):
+    for ddl in (
+        """CREATE TABLE IF NOT EXISTS farmers (phone VARCHAR(15) PRIMARY KEY, pin_hash VARCHAR(60),
+           language VARCHAR(5) DEFAULT 'en', literacy_lvl INT DEFAULT 0, crop VARCHAR(32),
+           village VARCHAR(64), score INT DEFAULT 0, created_at DOUBLE)""",
+        """CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY AUTO_INCREMENT, phone VARCHAR(15),
+           task_name VARCHAR(100), image_path VARCHAR(255), recognized VARCHAR(100), completed_at DOUBLE,
+           FOREIGN KEY (phone) REFERENCES farmers(phone))""",
+        """CREATE TABLE IF NOT EXISTS literacy_results (phone VARCHAR(15), step VARCHAR(32),
+           passed INT, seconds DOUBLE, points DOUBLE, taken_at DOUBLE)""",
+        """CREATE TABLE IF NOT EXISTS daily_tasks (phone VARCHAR(15), day DATE, slot INT,
+           task_key VARCHAR(48), points INT, PRIMARY KEY (phone, day, slot))""",
+        """CREATE TABLE IF NOT EXISTS points_ledger (event_id CHAR(64) PRIMARY KEY, phone VARCHAR(15),
+           task_key VARCHAR(48), points INT, created_at DOUBLE)""",
+        """CREATE TABLE IF NOT EXISTS badges (holder VARCHAR(64), badge VARCHAR(48), awarded_at DOUBLE,
+           PRIMARY KEY (holder, badge))""",
+        """CREATE TABLE IF NOT EXISTS blobs (digest CHAR(64) PRIMARY KEY, size BIGINT,
+           refcount INT DEFAULT 0, recognition TEXT, created_at DOUBLE)""",
+    ):
+        c.execute(_ddl(pool, ddl))
+
+
+@migration(2, "upgrade tables created by App langs.py")
+def _upgrade_legacy(pool, c):
+    # Older deployments created farmers(phone, pin, literacy_level 1..3, score)
+    # and tasks without completed_at; bring them to the unified columns.
+    have = _columns(c, "farmers")
+    for col, ddl in (("pin_hash", "VARCHAR(60)"), ("language", "VARCHAR(5) DEFAULT 'en'"),
+                     ("literacy_lvl", "INT DEFAULT 0"), ("crop", "VARCHAR(32)"), ("village", "VARCHAR(64)"),
+                     ("score", "INT DEFAULT 0"), ("created_at", "DOUBLE")):
+        if col not in have:
+            c.execute(f"ALTER TABLE farmers ADD COLUMN {col} {ddl}")
+    if "literacy_level" in have:
+        c.execute("UPDATE farmers SET literacy_lvl = literacy_level - 1 WHERE literacy_level IS NOT NULL")
+    if "pin" in have:
+        c.execute("SELECT phone, pin FROM farmers WHERE pin IS NOT NULL AND pin_hash IS NULL")
+        plain = c.fetchall()
+        if plain:
+            from auth_service import AuthService
+            auth = AuthService()
+            hashes = auth.hash_pins(pin for _, pin in plain)
+            auth.shutdown()
+            c.executemany(pool.sql("UPDATE farmers SET pin_hash=%s WHERE phone=%s"),
+                          [(h, phone) for (phone, _), h in zip(plain, hashes)])
+        c.execute("UPDATE farmers SET pin=NULL")  # no plaintext PINs left behind
+    if "completed_at" not in _columns(c, "tasks"):
+        c.execute("ALTER TABLE tasks ADD COLUMN completed_at DOUBLE")
+
+
+@migration(3, "indexes for hot queries")
+def _indexes(pool, c):
+    # MySQL commits each CREATE INDEX on its own, so skip the ones a failed
+    # earlier run already made
+    for name, table, columns in (
+        ("tasks_phone_completed", "tasks", "phone, completed_at"),  # task history
+        ("tasks_image", "tasks", "image_path"),                     # blob refcounts
+        ("farmers_score", "farmers", "score, phone"),               # leaderboard
+        ("farmers_village", "farmers", "village"),
+        ("ledger_phone", "points_ledger", "phone, created_at"),     # points history
+        ("literacy_phone", "literacy_results", "phone, taken_at"),
+        ("daily_tasks_day", "daily_tasks", "day"),                  # nightly purge
+    ):
+        if not _index_exists(pool, c, table, name):
+            c.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+
+
+@migration(4, "literacy score for adaptive UI profiles")
+def _literacy_score(pool, c):
+    # 0..1 share of test points; ui_profiles picks a profile from it
+    if "literacy_score" not in _columns(c, "farmers"):
+        c.execute("ALTER TABLE farmers ADD COLUMN literacy_score DOUBLE")
+
+
+@migration(5, "completion day in the points ledger")
+def _ledger_day(pool, c):
+    # The day the farmer did the task (offline completions sync later), so
+    # streaks replay the same after a restart.
+    if "day" not in _columns(c, "points_ledger"):
+        c.execute("ALTER TABLE points_ledger ADD COLUMN day DATE")
+    c.execute("SELECT event_id, created_at FROM points_ledger WHERE day IS NULL")
+    c.executemany(pool.sql("UPDATE points_ledger SET day=%s WHERE event_id=%s"),
+                  [(datetime.date.fromtimestamp(at).isoformat(), event_id) for event_id, at in c.fetchall()])
+
+
+@migration(6, "applied sync keys")
+def _sync_applied(pool, c):
+    # Keys of outbox items already applied (sync_queue.LocalSender), so a
+    # resent batch does not write its rows twice.
+    c.execute("""CREATE TABLE IF NOT EXISTS sync_applied (sync_key VARCHAR(64) PRIMARY KEY, result TEXT,
+        applied_at DOUBLE)""")
+
+
+LATEST = max(v for v, _, _ in MIGRATIONS)
+VERSION_TABLE = """CREATE TABLE IF NOT EXISTS schema_version (version INT PRIMARY KEY, name VARCHAR(64),
+    applied_at DOUBLE)"""
+
+
+def current_version(pool):
+    """Recorded schema version (0 for a new database); read-only, no DDL."""
+    with pool.connection() as db:
+        c = db.cursor()
+        if not _table_exists(pool, c, "schema_version"):
+            return 0
+        c.execute("SELECT MAX(version) FROM schema_version")
+        row = c.fetchone()
+    return row[0] or 0
+
+
+def migrate(pool, target=LATEST):
+    """Apply pending migrations up to `target` in order; returns the versions applied.
+    Each step is safe to re-run after a partial failure."""
+    with pool.connection() as db:
+        db.cursor().execute(VERSION_TABLE)
+        db.commit()
+    applied = []
+    start = current_version(pool)
+    for version, name, step in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if start < version <= target:
+            with pool.connection() as db:
+                c = db.cursor()
+                step(pool, c)
+                c.execute(pool.sql("INSERT INTO schema_version (version, name, applied_at) VALUES (%s, %s, %s)"),
+                          (version, name, time.time()))
+                db.commit()
+            applied.append(version)
+    return applied
+
+
+def require_current(pool):
+    """Startup check: fail fast instead of running DDL from a session."""
+    version = current_version(pool)
+    if version < LATEST:
+        raise RuntimeError(f"database schema is at version {version}, need {LATEST}: run python migrations.py")
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import random
+    import statistics
+    import tempfile
+
+    from db_pool import mysql_pool, sqlite_pool
+
+    ap = argparse.ArgumentParser(description="Apply pending schema migrations")
+    ap.add_argument("--sqlite", help="migrate this sqlite file instead of MySQL")
+    ap.add_argument("--host", default="localhost")
+    ap.add_argument("--user", default="db_user")
+    ap.add_argument("--password", default="root")
+    ap.add_argument("--database", default="farming_db")
+    ap.add_argument("--bench", type=int, metavar="FARMERS",
+                    help="time the hot queries on seeded sqlite data before and after the index migration")
+    args = ap.parse_args()
+
+    if not args.bench:
+        if args.sqlite:
+            pool = sqlite_pool(args.sqlite, size=1)
+        else:
+            pool = mysql_pool({"host": args.host, "user": args.user, "password": args.password,
+                               "database": args.database}, size=1)
+        applied = migrate(pool)
+        print(f"applied {applied or 'nothing'}; schema at version {current_version(pool)}")
+        raise SystemExit
+
+    n = args.bench
+    pool = sqlite_pool(os.path.join(tempfile.mkdtemp(), "bench.db"), size=1)
+    migrate(pool, target=2)
+    phones = [f"9{i:09d}" for i in range(n)]
+    with pool.connection() as db:
+        db.executemany("INSERT INTO farmers (phone, village, score) VALUES (?, ?, ?)",
+                       [(p, f"v{i % 200}", random.randrange(5000)) for i, p in enumerate(phones)])
+        db.executemany("INSERT INTO tasks (phone, task_name, completed_at) VALUES (?, ?, ?)",
+                       ((random.choice(phones), "check_pests", random.uniform(0, 1e7)) for _ in range(20 * n)))
+        db.executemany("INSERT INTO points_ledger VALUES (?, ?, ?, ?, ?)",
+                       ((f"{i:064x}", random.choice(phones), "check_pests", 10, random.uniform(0, 1e7))
+                        for i in range(10 * n)))
+        db.commit()
+
+    queries = {
+        "task history": ("SELECT task_name, completed_at FROM tasks WHERE phone=? "
+                         "ORDER BY completed_at DESC LIMIT 20", lambda: (random.choice(phones),)),
+        "leaderboard top10": ("SELECT phone, score FROM farmers ORDER BY score DESC LIMIT 10", lambda: ()),
+        "rank": ("SELECT COUNT(*) + 1 FROM farmers WHERE score > ?", lambda: (random.randrange(5000),)),
+        "points history": ("SELECT task_key, points FROM points_ledger WHERE phone=? "
+                           "ORDER BY created_at DESC LIMIT 20", lambda: (random.choice(phones),)),
+    }
+
+    def measure():
+        out = {}
+        with pool.connection() as db:
+            for name, (sql, params) in queries.items():
+                samples = []
+                for _ in range(200):
+                    t0 = time.perf_counter()
+                    db.execute(sql, params()).fetchall()
+                    samples.append(time.perf_counter() - t0)
+                out[name] = 1e3 * statistics.median(samples)
+        return out
+
+    before = measure()
+    migrate(pool)
+    after = measure()
+    print(f"{n:,} farmers, {20 * n:,} tasks, {10 * n:,} ledger rows (sqlite), median ms per query:")
+    for name in queries:
+        print(f"  {name:18s} {before[name]:8.3f} -> {after[name]:7.3f}")
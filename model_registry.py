@@ -0,0 +1,120 @@
+# model_registry.py
+# Process-wide, lazily loaded models plus a micro-batching queue that merges
+# inference requests from concurrent sessions into one predict() call.
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+_loaders = {}
+_models = {}
+_batchers = {}
+_lock = threading.Lock()
+
+
+def register_model(name, loader):
+    """Register a zero-argument loader; nothing is loaded until first use."""
+    _loaders[name] = loader
+
+
+def get_model(name):
+    """Load the model on first call and share it for the life of the process."""
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                model = _models[name] = _loaders[name]()
+    return model
+
+
+def get_batcher(name, max_batch=16, max_wait=0.01):
+    """Shared MicroBatcher for a registered model (settings apply on first call)."""
+    with _lock:
+        if name not in _batchers:
+            _batchers[name] = MicroBatcher(lambda x: get_model(name).predict(x, verbose=0),
+                                           max_batch=max_batch, max_wait=max_wait)
+        return _batchers[name]
+
+
+class MicroBatcher:
+    def __init__(self, predict, max_batch=16, max_wait=0.01, history=2000):
+        self.predict = predict        # (N, ...) array -> (N, ...) array
+        self.max_batch = max_batch
+        self.max_wait = max_wait      # seconds to wait for a batch to fill
+        self._queue = queue.Queue()
+        self._latency = deque(maxlen=history)
+        self._batch_sizes = deque(maxlen=history)
+        self._served = 0
+        self._started = None
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, x):
+        """Queue one input (without batch axis); returns a Future of its output row."""
+        fut = Future()
+        self._queue.put((x, fut, time.perf_counter()))
+        return fut
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if self._started is None:
+                self._started = time.perf_counter()
+            try:
+                out = self.predict(np.stack([x for x, _, _ in batch]))
+            except Exception as ex:
+                for _, fut, _ in batch:
+                    fut.set_exception(ex)
+                continue
+            done = time.perf_counter()
+            for row, (_, fut, queued_at) in zip(out, batch):
+                fut.set_result(row)
+                self._latency.append(done - queued_at)
+            self._batch_sizes.append(len(batch))
+            self._served += len(batch)
+
+    def stats(self):
+        lat = sorted(self._latency)
+        pct = lambda p: 1000 * lat[min(len(lat) - 1, int(p * len(lat)))] if lat else 0.0
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return {
+            "served": self._served,
+            "throughput_per_s": self._served / elapsed if elapsed else 0.0,
+            "avg_batch": sum(self._batch_sizes) / len(self._batch_sizes) if self._batch_sizes else 0.0,
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99),
+        }
+
+
+if __name__ == "__main__":
+    # CPU benchmark: python model_registry.py [--dummy]
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+
+    if "--dummy" in sys.argv:
+        w = np.random.rand(224 * 224 * 3, 1000).astype("float32")
+        register_model("bench", lambda: type("M", (), {
+            "predict": lambda self, x, verbose=0: x.reshape(len(x), -1) @ w})())
+    else:
+        from tensorflow.keras.applications import mobilenet_v2
+        register_model("bench", lambda: mobilenet_v2.MobileNetV2(weights="imagenet"))
+    get_model("bench")
+    img = np.random.rand(224, 224, 3).astype("float32")
+    for max_batch in (1, 8, 32):
+        batcher = MicroBatcher(lambda x: get_model("bench").predict(x, verbose=0),
+                               max_batch=max_batch, max_wait=0.01)
+        with ThreadPoolExecutor(32) as ex:
+            list(ex.map(lambda _: batcher.submit(img).result(), range(256)))
+        print(f"max_batch={max_batch:2d}: {batcher.stats()}")
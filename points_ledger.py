@@ -0,0 +1,219 @@
+# points_ledger.py
+# Append-only points ledger. Each task completion is one row keyed by an
+# idempotency key (farmer, day, task), so retries and double taps award once;
+# farmers.score and the in-memory leaderboard are bumped in step with it.
+import bisect
+import datetime
+import hashlib
+import threading
+import time
+
+INSERT_EVENT = ("INSERT IGNORE INTO points_ledger (event_id, phone, task_key, points, day, created_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s)")
+
+
+def completion_key(phone, task_key, day=None):
+    day = day or datetime.date.today()
+    return hashlib.sha256(f"{phone}|{day.isoformat()}|{task_key}".encode()).hexdigest()
+
+
+class Leaderboard:
+    """Scores kept sorted in fixed-size chunks: O(log n) lookups and cheap
+    inserts/removes even with a million farmers (one flat list would memmove
+    megabytes per update)."""
+    LOAD = 1000
+
+    def __init__(self):
+        self._scores = {}
+        self._chunks = []   # sorted lists of (-score, phone)
+        self._maxes = []    # last key of each chunk
+        self._lock = threading.Lock()
+
+    def load(self, rows):
+        """Replace the board with (phone, score) rows."""
+        keys = sorted((-score, phone) for phone, score in rows)
+        with self._lock:
+            self._scores = {phone: -neg for neg, phone in keys}
+            self._chunks = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+            self._maxes = [c[-1] for c in self._chunks]
+
+    def __len__(self):
+        return len(self._scores)
+
+    def _insert(self, key):
+        if not self._chunks:
+            self._chunks, self._maxes = [[key]], [key]
+            return
+        i = min(bisect.bisect_left(self._maxes, key), len(self._chunks) - 1)
+        chunk = self._chunks[i]
+        bisect.insort(chunk, key)
+        self._maxes[i] = chunk[-1]
+        if len(chunk) > 2 * self.LOAD:
+            self._chunks[i:i + 1] = [chunk[:self.LOAD], chunk[self.LOAD:]]
+            self._maxes[i:i + 1] = [chunk[self.LOAD - 1], chunk[-1]]
+
+    def _remove(self, key):
+        i = bisect.bisect_left(self._maxes, key)
+        chunk = self._chunks[i]
+        del chunk[bisect.bisect_left(chunk, key)]
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i], self._maxes[i]
+
+    def add(self, phone, points):
+        """Add points to a farmer; returns the new score."""
+        with self._lock:
+            old = self._scores.get(phone)
+            if old is not None:
+                self._remove((-old, phone))
+            score = self._scores[phone] = (old or 0) + points
+            self._insert((-score, phone))
+            return score
+
+    def score(self, phone):
+        return self._scores.get(phone, 0)
+
+    def rank(self, phone):
+        """1-based position (ties broken by phone), or None if no points yet."""
+        with self._lock:
+            score = self._scores.get(phone)
+            if score is None:
+                return None
+            key = (-score, phone)
+            i = bisect.bisect_left(self._maxes, key)
+            return sum(map(len, self._chunks[:i])) + bisect.bisect_left(self._chunks[i], key) + 1
+
+    def top(self, n=10):
+        """[(phone, score), ...] best first."""
+        out = []
+        with self._lock:
+            for chunk in self._chunks:
+                out += chunk[:n - len(out)]
+                if len(out) >= n:
+                    break
+        return [(phone, -neg) for neg, phone in out]
+
+
+class PointsLedger:
+    def __init__(self, pool, leaderboard=None):
+        self.pool = pool
+        self.leaderboard = leaderboard or Leaderboard()
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def award(self, phone, task_key, points, day=None, event_id=None, on_new=None):
+        """Record a completion once; returns True if it was new. `day` is when
+        the farmer did the task, which may be before it synced. on_new(cursor),
+        if given, runs in the same transaction when the row is new (e.g. to
+        write the tasks row), so all of it is stored or none."""
+        day = day or datetime.date.today()
+        event_id = event_id or completion_key(phone, task_key, day)
+        if not self._loaded:
+            # The board is being (or not yet) built: commit under its lock so
+            # the row is either in the load's snapshot or added after it.
+            with self._load_lock:
+                if not self._loaded:
+                    return self._insert(event_id, phone, task_key, points, day, on_new)
+        new = self._insert(event_id, phone, task_key, points, day, on_new)
+        if new:
+            self.leaderboard.add(phone, points)
+        return new
+
+    def _insert(self, event_id, phone, task_key, points, day, on_new):
+        with self.pool.connection() as db:
+            c = db.cursor()
+            c.execute(self.pool.sql(INSERT_EVENT),
+                      (event_id, phone, task_key, points, day.isoformat(), time.time()))
+            new = c.rowcount == 1
+            if new:
+                c.execute(self.pool.sql("UPDATE farmers SET score=COALESCE(score, 0)+%s WHERE phone=%s"),
+                          (points, phone))
+                if on_new is not None:
+                    on_new(c)
+            db.commit()
+        return new
+
+    def recorded(self, event_ids):
+        """The subset of event_ids already in the ledger."""
+        event_ids = list(event_ids)
+        if not event_ids:
+            return set()
+        with self.pool.connection() as db:
+            c = db.cursor()
+            c.execute(self.pool.sql("SELECT event_id FROM points_ledger WHERE event_id IN (%s)"
+                                    % ", ".join(["%s"] * len(event_ids))), event_ids)
+            return {row[0] for row in c.fetchall()}
+
+    def load_leaderboard(self):
+        """Build the board from the ledger, once; later awards keep it current."""
+        with self._load_lock:
+            if not self._loaded:
+                with self.pool.connection() as db:
+                    c = db.cursor()
+                    c.execute("SELECT phone, SUM(points) FROM points_ledger GROUP BY phone")
+                    self.leaderboard.load((phone, int(total)) for phone, total in c.fetchall())
+                self._loaded = True
+        return self.leaderboard
+
+    def standing(self, phone):
+        """(score, rank, farmers on the board) for a screen."""
+        board = self.load_leaderboard()
+        return board.score(phone), board.rank(phone), len(board)
+
+
+if __name__ == "__main__":
+    # Leaderboard at 1M farmers vs SQL rank queries on sqlite: python points_ledger.py
+    import os
+    import random
+    import statistics
+    import tempfile
+    from db_pool import sqlite_pool
+    from migrations import migrate
+
+    FARMERS, UPDATES, QUERIES = 1_000_000, 20_000, 2_000
+    rows = [(f"9{i:09d}", random.randrange(5000)) for i in range(FARMERS)]
+
+    def timed(fn, n):
+        samples = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        return 1e6 * statistics.median(samples), 1e6 * max(samples)
+
+    board = Leaderboard()
+    start = time.perf_counter()
+    board.load(rows)
+    print(f"load {FARMERS:,} farmers: {time.perf_counter() - start:.2f}s")
+    pick = lambda: rows[random.randrange(FARMERS)][0]
+    for name, fn, n in (("add", lambda: board.add(pick(), random.randrange(1, 20)), UPDATES),
+                        ("rank", lambda: board.rank(pick()), QUERIES),
+                        ("top10", lambda: board.top(10), QUERIES)):
+        p50, worst = timed(fn, n)
+        print(f"leaderboard {name:5s}: p50 {p50:8.1f} us  max {worst:9.1f} us")
+
+    pool = sqlite_pool(os.path.join(tempfile.mkdtemp(), "points.db"), size=1)
+    migrate(pool)  # includes the farmers (score, phone) index
+    with pool.connection() as db:
+        db.executemany("INSERT INTO farmers (phone, score) VALUES (?, ?)", rows)
+        db.commit()
+
+        def sql_rank():
+            phone = pick()
+            score = db.execute("SELECT score FROM farmers WHERE phone=?", (phone,)).fetchone()[0]
+            db.execute("SELECT COUNT(*) + 1 FROM farmers WHERE score > ?", (score,)).fetchone()
+
+        for name, fn in (("rank", sql_rank),
+                         ("top10", lambda: db.execute(
+                             "SELECT phone, score FROM farmers ORDER BY score DESC LIMIT 10").fetchall())):
+            p50, worst = timed(fn, 200)
+            print(f"sql (indexed) {name:5s}: p50 {p50:8.1f} us  max {worst:9.1f} us")
+
+    ledger = PointsLedger(pool, board)
+    ledger._loaded = True  # board already holds the seeded scores
+    start = time.perf_counter()
+    first = sum(ledger.award(phone, "check_pests", 10) for phone, _ in rows[:2000])
+    again = sum(ledger.award(phone, "check_pests", 10) for phone, _ in rows[:2000])
+    print(f"ledger: {4000 / (time.perf_counter() - start):,.0f} awards/s; "
+          f"{first} new, {2000 - again} retries ignored")
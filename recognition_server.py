@@ -0,0 +1,137 @@
+# recognition_server.py
+# Local crop-recognition service and its HTTP client.
+#   python recognition_server.py [--port 8000]
+# POST /crop-recognize with the raw image bytes as the body; returns JSON like
+# {"crop_type": "...", "status": "...", "confidence": 0.93}.
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8000
+MAX_UPLOAD_BYTES = 16 * 1024 * 1024
+
+
+# ---------- SERVER ----------
+class ResultCache:
+    """LRU of recognition results keyed by image SHA-256."""
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            if digest in self._data:
+                self._data.move_to_end(digest)
+                return self._data[digest]
+        return None
+
+    def put(self, digest, result):
+        with self._lock:
+            self._data[digest] = result
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class Recognizer:
+    def __init__(self, max_batch=16, max_wait=0.02, cache=None):
+        from model_registry import get_batcher, register_model
+        from tensorflow.keras.applications import mobilenet_v2
+        self._mobilenet = mobilenet_v2
+        register_model("mobilenet_v2", lambda: mobilenet_v2.MobileNetV2(weights="imagenet"))
+        self.batcher = get_batcher("mobilenet_v2", max_batch, max_wait)
+        self.cache = cache or ResultCache()
+
+    def _preprocess(self, img_bytes):
+        import numpy as np
+        from PIL import Image
+        img = Image.open(io.BytesIO(img_bytes)).convert("RGB").resize((224, 224))
+        return self._mobilenet.preprocess_input(np.asarray(img, dtype="float32"))
+
+    def recognize(self, img_bytes):
+        digest = hashlib.sha256(img_bytes).hexdigest()
+        result = self.cache.get(digest)
+        if result is None:
+            preds = self.batcher.submit(self._preprocess(img_bytes)).result()
+            _, label, score = self._mobilenet.decode_predictions(preds[None, ...], top=1)[0][0]
+            result = {"crop_type": label, "status": "unverified", "confidence": float(score)}
+            self.cache.put(digest, result)
+        return result
+
+
+def make_handler(recognizer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for the pooled client
+
+        def do_POST(self):
+            if self.path != "/crop-recognize":
+                return self._reply(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length", 0))
+            if not 0 < length <= MAX_UPLOAD_BYTES:
+                return self._reply(413, {"error": "bad image size"})
+            try:
+                self._reply(200, recognizer.recognize(self.rfile.read(length)))
+            except Exception as ex:
+                self._reply(500, {"error": str(ex)})
+
+        def _reply(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_local_server(port=DEFAULT_PORT, host="127.0.0.1", **recognizer_kw):
+    """Serve in a daemon thread; returns the server (call .shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), make_handler(Recognizer(**recognizer_kw)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="recognition-server", daemon=True).start()
+    return server
+
+
+# ---------- CLIENT ----------
+class RecognitionClient:
+    """Pooled keep-alive HTTP client with timeouts and retries."""
+    def __init__(self, url=f"http://localhost:{DEFAULT_PORT}/crop-recognize",
+                 timeout=(3, 30), retries=3, pool_size=10):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        self.url = url
+        self.timeout = timeout  # (connect, read) seconds
+        retry = Retry(total=retries, backoff_factor=0.3, allowed_methods=None,
+                      status_forcelist=(502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def recognize(self, img_bytes):
+        r = self.session.post(self.url, data=img_bytes, timeout=self.timeout,
+                              headers={"Content-Type": "application/octet-stream"})
+        r.raise_for_status()
+        return r.json()
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Local crop-recognition server")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--max-batch", type=int, default=16)
+    ap.add_argument("--max-wait", type=float, default=0.02)
+    args = ap.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(
+        Recognizer(max_batch=args.max_batch, max_wait=args.max_wait)))
+    print(f"Serving crop recognition on http://{args.host}:{args.port}/crop-recognize")
+    server.serve_forever()
@@ -0,0 +1,85 @@
+# session.py
+# Per-page session state. One Flet process serves many farmers, so language,
+# literacy level and UI parameters hang off the page's session instead of
+# module globals.
+import threading
+
+import ui_profiles
+
+
+class SessionContext:
+    __slots__ = ("session_id", "page", "lang", "literacy_lvl", "phone", "ui", "audio")
+
+    def __init__(self, session_id, page, lang="en"):
+        self.session_id = session_id
+        self.page = page
+        self.lang = lang
+        self.literacy_lvl = 0
+        self.phone = None
+        self.ui = ui_profiles.resolve(None, 0)  # immutable UIProfile for this farmer
+        self.audio = None   # this page's Audio control
+
+    def set_literacy(self, lvl, score=None):
+        """Coarse level (task eligibility) and the measured score, which picks the UI profile."""
+        self.literacy_lvl = lvl
+        self.ui = ui_profiles.resolve(score, lvl)
+
+
+class SessionRegistry:
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _key(self, page):
+        return getattr(page, "session_id", None) or id(page)
+
+    def for_page(self, page, lang="en"):
+        """The page's session, created on first call."""
+        key = self._key(page)
+        with self._lock:
+            ctx = self._sessions.get(key)
+            if ctx is None:
+                ctx = self._sessions[key] = SessionContext(key, page, lang)
+            return ctx
+
+    def end(self, page):
+        with self._lock:
+            self._sessions.pop(self._key(page), None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+sessions = SessionRegistry()
+
+
+if __name__ == "__main__":
+    # Isolation check: 2,000 concurrent sessions switching languages.
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    from catalog import catalog
+
+    class _Page:
+        pass
+
+    langs = list(catalog.languages())
+    expected = {lang: catalog.get(lang, "login") for lang in langs}
+
+    def farmer(i):
+        page = _Page()
+        ctx = sessions.for_page(page)
+        rnd = random.Random(i)
+        for _ in range(50):
+            ctx.lang = rnd.choice(langs)
+            ctx.set_literacy(rnd.randrange(3), rnd.random())
+            mine = (ctx.lang, ctx.literacy_lvl)
+            text = catalog.bundle(sessions.for_page(page).lang)["login"]
+            assert text == expected[mine[0]], "language leaked between sessions"
+            assert sessions.for_page(page).literacy_lvl == mine[1], "literacy level leaked"
+        sessions.end(page)
+        return True
+
+    with ThreadPoolExecutor(64) as ex:
+        ok = sum(ex.map(farmer, range(2000)))
+    print(f"{ok} sessions isolated; {len(sessions)} left open")
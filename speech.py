@@ -0,0 +1,105 @@
+# speech.py
+# Text-to-speech for App langs.py: memoized base64 audio per (text, lang) and a
+# small pool of Audio controls per page, reused round-robin instead of growing
+# page.overlay on every tap.
+import base64
+import io
+import math
+import struct
+import threading
+import wave
+from collections import OrderedDict
+
+
+# ---- backends: (text, lang) -> audio bytes ----
+def gtts_backend(text, lang):
+    from gtts import gTTS
+    return b"".join(gTTS(text=text, lang=lang).stream())
+
+
+def offline_backend(text, lang, rate=8000):
+    """Network-free stand-in: a short tone whose length tracks the text."""
+    frames = int(rate * min(2.0, 0.05 * len(text)))
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"".join(struct.pack("<h", int(8000 * math.sin(i / 8)))
+                               for i in range(frames)))
+    return buf.getvalue()
+
+
+class SpeechCache:
+    """LRU of synthesized audio shared by every page in the process, kept
+    base64-encoded as Audio.src_base64 wants it so a replay encodes nothing."""
+    def __init__(self, backend=gtts_backend, max_entries=256):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, text, lang):
+        key = (text, lang)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+        audio = base64.b64encode(self.backend(text, lang)).decode("ascii")
+        with self._lock:
+            self.misses += 1
+            self._data[key] = audio
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return audio
+
+
+class PageSpeaker:
+    """Plays speech on one page through a fixed number of Audio controls."""
+    def __init__(self, page, cache, pool_size=2, audio_factory=None):
+        if audio_factory is None:
+            from flet_audio import Audio
+            audio_factory = lambda: Audio(src="", autoplay=False, volume=1)
+        self.page = page
+        self.cache = cache
+        self._controls = [audio_factory() for _ in range(pool_size)]
+        self._next = 0
+        page.overlay.extend(self._controls)
+
+    def speak(self, text, lang):
+        audio = self._controls[self._next]
+        self._next = (self._next + 1) % len(self._controls)
+        audio.src = None  # src (a URL or path) would take precedence over src_base64
+        audio.src_base64 = self.cache.get(text, lang)
+        audio.update()
+        audio.play()
+
+
+if __name__ == "__main__":
+    # 1,000 taps on one page with the offline backend: python speech.py
+    import time
+
+    class _Page:
+        def __init__(self):
+            self.overlay = []
+
+    class _Audio:
+        src = src_base64 = None
+        def update(self): pass
+        def play(self): pass
+
+    prompts = ["This is your daily task.", "Check soil moisture and upload a photo.",
+               "Identify the weed in the photo and upload its image."]
+    page = _Page()
+    speaker = PageSpeaker(page, SpeechCache(offline_backend), audio_factory=_Audio)
+    samples = []
+    for i in range(1000):
+        start = time.perf_counter()
+        speaker.speak(prompts[i % len(prompts)], ["en", "ta", "hi"][i % 3])
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    print(f"overlay size after 1000 taps: {len(page.overlay)}")
+    print(f"p50 {1000 * samples[500]:.3f} ms  p99 {1000 * samples[990]:.3f} ms  "
+          f"hits {speaker.cache.hits} misses {speaker.cache.misses}")
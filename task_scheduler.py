@@ -0,0 +1,190 @@
+# task_scheduler.py
+# Daily tasks per farmer. A nightly job picks each farmer's tasks from
+# specs/task_templates.json by crop and literacy level and bulk-writes them to
+# daily_tasks; opening the task screen is then one primary-key read, kept in a
+# cache that is dropped when the day changes. Task text is a catalog key, so
+# it is shown in whatever language the session is using.
+import datetime
+import json
+import os
+import threading
+import zlib
+from functools import lru_cache
+
+from catalog import catalog
+
+DEFAULT_TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "specs", "task_templates.json")
+
+INSERT_TASK = "INSERT IGNORE INTO daily_tasks (phone, day, slot, task_key, points) VALUES (%s, %s, %s, %s, %s)"
+SELECT_TASKS = "SELECT task_key, points FROM daily_tasks WHERE phone=%s AND day=%s ORDER BY slot"
+
+CHUNK_SIZE = 1000  # farmers per read/executemany/commit in the nightly job
+
+
+class Templates:
+    def __init__(self, spec):
+        self.per_farmer = spec.get("per_farmer", 3)
+        self.by_id = {t["id"]: t for t in spec["templates"]}
+        self._all = spec["templates"]
+
+    @lru_cache(maxsize=None)
+    def eligible(self, crop, level):
+        """Templates for a (crop, level); computed once per pair, not per farmer."""
+        return tuple(t for t in self._all
+                     if (not t.get("crops") or crop in t["crops"])
+                     and t.get("levels", [0, 99])[0] <= level <= t.get("levels", [0, 99])[1])
+
+    def pick(self, phone, crop, level, day):
+        """Deterministic daily rotation through the farmer's eligible templates."""
+        pool = self.eligible(crop, level)
+        if not pool:
+            return ()
+        start = (day.toordinal() + zlib.crc32(phone.encode())) % len(pool)
+        n = min(self.per_farmer, len(pool))
+        return tuple(pool[(start + i) % len(pool)] for i in range(n))
+
+    def rows(self, phone, crop, level, day):
+        return [(phone, day.isoformat(), slot, t["id"], t.get("points", 0))
+                for slot, t in enumerate(self.pick(phone, crop, level, day))]
+
+
+@lru_cache(maxsize=None)
+def load_templates(path=DEFAULT_TEMPLATES):
+    with open(path, encoding="utf-8") as f:
+        return Templates(json.load(f))
+
+
+def generate_day(pool, day=None, templates=None):
+    """Nightly bulk job: write `day`'s tasks for every farmer; returns rows written.
+    Safe to re-run: existing (phone, day, slot) rows are kept."""
+    day = day or datetime.date.today() + datetime.timedelta(days=1)
+    templates = templates or load_templates()
+    select = pool.sql("SELECT phone, crop, literacy_lvl FROM farmers "
+                      f"WHERE phone > %s ORDER BY phone LIMIT {CHUNK_SIZE}")
+    written, last = 0, ""
+    with pool.connection() as db:
+        c = db.cursor()
+        while True:  # keyset pages over the primary key; no cursor held open across commits
+            c.execute(select, (last,))
+            farmers = c.fetchall()
+            if not farmers:
+                break
+            rows = []
+            for phone, crop, level in farmers:
+                rows += templates.rows(phone, crop, level or 0, day)
+            c.executemany(pool.sql(INSERT_TASK), rows)
+            db.commit()
+            written += len(rows)
+            last = farmers[-1][0]
+    return written
+
+
+def purge_before(pool, day):
+    with pool.connection() as db:
+        c = db.cursor()
+        c.execute(pool.sql("DELETE FROM daily_tasks WHERE day < %s"), (day.isoformat(),))
+        db.commit()
+        return c.rowcount
+
+
+class DailyTasks:
+    """Per-farmer task lists for today, read once from daily_tasks and cached."""
+    def __init__(self, pool, templates=None):
+        self.pool = pool
+        self.templates = templates or load_templates()
+        self._day = None
+        self._cache = {}    # phone -> ((task_key, points), ...)
+        self._lock = threading.Lock()
+        self.hits = self.reads = self.generated = 0
+
+    def _today(self, day):
+        day = day or datetime.date.today()
+        with self._lock:
+            if day != self._day:  # new day: yesterday's lists are never read again
+                self._day, self._cache = day, {}
+        return day
+
+    def for_farmer(self, phone, crop=None, level=0, day=None):
+        """Today's (task_key, points) pairs; crop/level only matter for farmers
+        registered after the nightly job, whose list is generated on the spot."""
+        day = self._today(day)
+        tasks = self._cache.get(phone)
+        if tasks is not None:
+            self.hits += 1
+            return tasks
+        self.reads += 1
+        with self.pool.connection() as db:
+            c = db.cursor()
+            c.execute(self.pool.sql(SELECT_TASKS), (phone, day.isoformat()))
+            tasks = tuple(c.fetchall())
+            if not tasks:
+                rows = self.templates.rows(phone, crop, level, day)
+                c.executemany(self.pool.sql(INSERT_TASK), rows)
+                db.commit()
+                self.generated += 1
+                tasks = tuple((r[3], r[4]) for r in rows)
+        with self._lock:
+            if day == self._day:
+                self._cache[phone] = tasks
+        return tasks
+
+    def describe(self, phone, lang, **kw):
+        """Task dicts for a screen: {"id", "desc", "points"} in `lang`."""
+        text = catalog.bundle(lang)
+        return [{"id": key, "desc": text.get(self.templates.by_id[key]["text"], key), "points": points}
+                for key, points in self.for_farmer(phone, **kw) if key in self.templates.by_id]
+
+    def forget(self, phone):
+        """Drop a cached list, e.g. after a farmer's crop or level changes."""
+        with self._lock:
+            self._cache.pop(phone, None)
+
+    def stats(self):
+        return {"cached": len(self._cache), "hits": self.hits, "reads": self.reads,
+                "generated": self.generated}
+
+
+if __name__ == "__main__":
+    # Nightly job and screen opens on an sqlite stand-in: python task_scheduler.py
+    import random
+    import tempfile
+    import time
+    from db_pool import sqlite_pool
+    from migrations import migrate
+
+    FARMERS, OPENS = 50_000, 20_000
+    pool = sqlite_pool(os.path.join(tempfile.mkdtemp(), "tasks.db"), size=2)
+    crops = ["rice", "tomato", "millet", None]
+    migrate(pool)
+    with pool.connection() as db:
+        db.executemany("INSERT INTO farmers (phone, crop, literacy_lvl) VALUES (?, ?, ?)",
+                       [(f"9{i:09d}", crops[i % 4], i % 3) for i in range(FARMERS)])
+        db.commit()
+    today = datetime.date.today()
+
+    start = time.perf_counter()
+    n = generate_day(pool, today)
+    took = time.perf_counter() - start
+    print(f"nightly job: {n} rows for {FARMERS} farmers in {took:.2f}s ({n / took:,.0f} rows/s)")
+
+    templates = load_templates()
+    # A day of screen opens: 2,000 active farmers, ten opens each
+    phones = [f"9{random.randrange(FARMERS):09d}" for _ in range(2000)] * 10
+    random.shuffle(phones)
+
+    def recompute(phone):  # farmer row + template scan on every open
+        with pool.connection() as db:
+            crop, lvl = db.execute("SELECT crop, literacy_lvl FROM farmers WHERE phone=?", (phone,)).fetchone()
+        return Templates.eligible.__wrapped__(templates, crop, lvl)
+
+    uncached = DailyTasks(pool)
+    cached = DailyTasks(pool)
+    for name, fn in (("recompute per open", recompute),
+                     ("daily_tasks read", lambda p: (uncached.forget(p), uncached.describe(p, "ta"))),
+                     ("daily_tasks + cache", lambda p: cached.describe(p, "ta"))):
+        start = time.perf_counter()
+        for p in phones:
+            fn(p)
+        took = time.perf_counter() - start
+        print(f"{name:20s}: {1e6 * took / len(phones):7.1f} us/open")
+    print(cached.stats())
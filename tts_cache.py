@@ -0,0 +1,113 @@
+# tts_cache.py
+# Content-addressed cache for synthesized speech. Files are named by a stable
+# digest of (lang, voice, text), so they survive restarts, and an index.json
+# tracks sizes and recency for size-capped LRU eviction.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+INDEX_NAME = "index.json"
+
+
+def audio_key(text, lang, voice=None):
+    return hashlib.sha256(f"{lang}\0{voice or ''}\0{text}".encode()).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, directory, render, max_bytes=200 * 1024 * 1024, ext=".wav"):
+        """render(text, lang, voice, path) must write the audio file to path."""
+        self.directory = directory
+        self.render = render
+        self.max_bytes = max_bytes
+        self.ext = ext
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # key -> {"size", "used", "lang"}; oldest first
+        self._total = 0
+        self._dirty = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + self.ext)
+
+    # ---- lookup ----
+    def lookup(self, text, lang, voice=None):
+        """Return the cached file path, or None without rendering."""
+        key = audio_key(text, lang, voice)
+        fp = self.path_for(key)
+        with self._lock:
+            if key in self._entries and os.path.exists(fp):
+                self._touch(key)
+                return fp
+        return None
+
+    def get(self, text, lang, voice=None):
+        """Return the cached file path, rendering it on a miss."""
+        fp = self.lookup(text, lang, voice)
+        if fp:
+            return fp
+        key = audio_key(text, lang, voice)
+        fp = self.path_for(key)
+        self.render(text, lang, voice, fp)
+        with self._lock:
+            self._add(key, fp, lang)
+        return fp
+
+    def __contains__(self, item):
+        text, lang, voice = (item + (None,))[:3]
+        return audio_key(text, lang, voice) in self._entries
+
+    def _touch(self, key):
+        self._entries.move_to_end(key)
+        self._entries[key]["used"] = time.time()
+        self._dirty += 1
+        if self._dirty >= 50:  # don't rewrite the index on every hit
+            self.save_index()
+
+    def _add(self, key, fp, lang):
+        size = os.path.getsize(fp) if os.path.exists(fp) else 0
+        old = self._entries.pop(key, None)
+        if old:
+            self._total -= old["size"]
+        self._entries[key] = {"size": size, "used": time.time(), "lang": lang}
+        self._total += size
+        self._evict()
+        self.save_index()
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._total -= entry["size"]
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    # ---- index file ----
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_NAME), encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        for key, entry in sorted(saved.items(), key=lambda kv: kv[1].get("used", 0)):
+            if os.path.exists(self.path_for(key)):
+                self._entries[key] = entry
+                self._total += entry.get("size", 0)
+        self._evict()
+
+    def save_index(self):
+        with self._lock:
+            data = json.dumps(self._entries)
+            self._dirty = 0
+        idx = os.path.join(self.directory, INDEX_NAME)
+        tmp = idx + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, idx)
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes}
@@ -0,0 +1,79 @@
+# tts_worker.py
+# One background thread owns the TTS engine and renders queued requests into a
+# TTSCache. Identical in-flight requests share a single Future.
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from tts_cache import audio_key
+
+
+class SynthesisWorker:
+    def __init__(self, cache, history=1000):
+        self.cache = cache
+        self._jobs = queue.Queue()
+        self._inflight = {}  # audio_key -> Future
+        self._lock = threading.Lock()
+        self.queue_wait = deque(maxlen=history)   # seconds, per rendered job
+        self.synth_time = deque(maxlen=history)
+        self.deduped = 0
+        self.hits = 0
+        self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, text, lang, voice=None):
+        """Return a Future resolving to the audio file path."""
+        path = self.cache.lookup(text, lang, voice)
+        if path:
+            self.hits += 1
+            fut = Future()
+            fut.set_result(path)
+            return fut
+        key = audio_key(text, lang, voice)
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.deduped += 1
+                return fut
+            fut = self._inflight[key] = Future()
+        self._jobs.put((key, text, lang, voice, time.perf_counter()))
+        return fut
+
+    def _run(self):
+        while True:
+            key, text, lang, voice, queued_at = self._jobs.get()
+            started = time.perf_counter()
+            with self._lock:
+                fut = self._inflight[key]
+            try:
+                path = self.cache.get(text, lang, voice)
+            except Exception as ex:
+                fut.set_exception(ex)
+            else:
+                fut.set_result(path)
+            finally:
+                done = time.perf_counter()
+                self.queue_wait.append(started - queued_at)
+                self.synth_time.append(done - started)
+                with self._lock:
+                    del self._inflight[key]
+
+    def latency(self):
+        """Queue-wait and synthesis p50/p95 in milliseconds."""
+        def pct(samples, p):
+            if not samples:
+                return 0.0
+            s = sorted(samples)
+            return 1000 * s[min(len(s) - 1, int(p * len(s)))]
+        return {
+            "queued": self._jobs.qsize(),
+            "rendered": len(self.synth_time),
+            "hits": self.hits,
+            "deduped": self.deduped,
+            "queue_wait_p50_ms": pct(self.queue_wait, 0.50),
+            "queue_wait_p95_ms": pct(self.queue_wait, 0.95),
+            "synth_p50_ms": pct(self.synth_time, 0.50),
+            "synth_p95_ms": pct(self.synth_time, 0.95),
+        }
@@ -0,0 +1,126 @@
+# ui_profiles.py
+# Adaptive-UI profiles shared by every app entry point. Profiles are declared
+# in specs/ui_profiles.json, built once per process into immutable UIProfile
+# tuples with their derived sizes already worked out, and picked from the
+# farmer's measured literacy score. Being hashable, a profile can key cached
+# views and control templates directly.
+import bisect
+import json
+import os
+from functools import lru_cache
+from typing import NamedTuple
+
+DEFAULT_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "specs", "ui_profiles.json")
+
+
+class UIProfile(NamedTuple):
+    level: int              # index in the spec, 0 = most assistance
+    id: str
+    min_score: float
+    button_size: int
+    icon_size: int
+    text_size: int
+    use_voice: bool
+    layout: str             # "linear" | "grid" | "advanced"
+    help: bool
+    show_points: bool
+    calendar: bool
+    task_width: int         # derived sizes, so screens do no layout math
+    task_height: int
+    title_size: int
+
+
+def _build(level, spec):
+    size = spec["button_size"]
+    return UIProfile(
+        level=level, id=spec["id"], min_score=spec["min_score"], button_size=size,
+        icon_size=spec["icon_size"], text_size=spec["text_size"], use_voice=spec["use_voice"],
+        layout=spec["layout"], help=spec["help"], show_points=spec["show_points"],
+        calendar=spec["calendar"],
+        task_width=size * 5, task_height=round(size * 1.4),
+        title_size=spec["text_size"] + 6,
+    )
+
+
+class Profiles:
+    def __init__(self, specs):
+        specs = sorted(specs, key=lambda s: s["min_score"])
+        self.profiles = tuple(_build(i, s) for i, s in enumerate(specs))
+        self._cuts = [p.min_score for p in self.profiles[1:]]
+        self._fallback = {s["fallback_for"]: p for s, p in zip(specs, self.profiles) if "fallback_for" in s}
+        # literacy_lvl -> (lowest, highest) profile level its score may pick:
+        # from its fallback profile up to just below the next level's
+        starts = sorted((lvl, p.level) for lvl, p in self._fallback.items())
+        self._bands = {lvl: (lo, starts[i + 1][1] - 1 if i + 1 < len(starts) else len(self.profiles) - 1)
+                       for i, (lvl, lo) in enumerate(starts)}
+        self.by_id = {p.id: p for p in self.profiles}
+
+    def for_score(self, score):
+        """Profile for a 0..1 literacy score."""
+        return self.profiles[bisect.bisect_right(self._cuts, score)]
+
+    def for_level(self, lvl):
+        """Profile for a coarse farmers.literacy_lvl when no score was recorded."""
+        if lvl in self._fallback:
+            return self._fallback[lvl]
+        return self.profiles[-1] if lvl > max(self._fallback, default=0) else self.profiles[0]
+
+    def resolve(self, score=None, lvl=0):
+        """Profile for a measured score, kept within the band of the farmer's
+        level: a suite whose points and thresholds disagree (e.g. full marks
+        on a one-step test that can only ever give level 0) cannot skip the
+        assistance the level calls for."""
+        floor = self.for_level(lvl or 0)
+        if score is None:
+            return floor
+        lo, hi = self._bands.get(lvl or 0, (floor.level, floor.level))
+        return self.profiles[min(max(self.for_score(score).level, lo), hi)]
+
+    def __len__(self):
+        return len(self.profiles)
+
+
+@lru_cache(maxsize=None)
+def load_profiles(path=DEFAULT_SPEC):
+    with open(path, encoding="utf-8") as f:
+        return Profiles(json.load(f)["profiles"])
+
+
+def resolve(score=None, lvl=0):
+    return load_profiles().resolve(score, lvl)
+
+
+if __name__ == "__main__":
+    # Per-render dict + size math vs precomputed profiles: python ui_profiles.py
+    import random
+    import time
+
+    def old_ui_params(lit_level):  # what get_ui_params did when ctx.ui was empty
+        if lit_level == 0:
+            return {'button_size': 50, 'icon_size': 42, 'use_voice': True, 'layout': 'linear', 'help': True}
+        elif lit_level == 1:
+            return {'button_size': 42, 'icon_size': 32, 'use_voice': False, 'layout': 'grid', 'help': False}
+        return {'button_size': 32, 'icon_size': 22, 'use_voice': False, 'layout': 'advanced', 'help': False}
+
+    RENDERS, BUTTONS = 200_000, 3
+    levels = [random.randrange(3) for _ in range(RENDERS)]
+    scores = [random.random() for _ in range(RENDERS)]
+    profiles = load_profiles()
+
+    start = time.perf_counter()
+    for lvl in levels:
+        ui = old_ui_params(lvl)
+        for _ in range(BUTTONS):
+            kw = {"width": ui["button_size"] * 5, "height": ui["button_size"] * 1.4}
+    old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for score in scores:
+        ui = profiles.for_score(score)
+        for _ in range(BUTTONS):
+            kw = {"width": ui.task_width, "height": ui.task_height}
+    new = time.perf_counter() - start
+
+    print(f"{RENDERS:,} renders x {BUTTONS} buttons: dict per render {1e9 * old / RENDERS:.0f} ns, "
+          f"precomputed profile {1e9 * new / RENDERS:.0f} ns; "
+          f"{len(profiles)} profiles instead of 3 levels: {', '.join(p.id for p in profiles.profiles)}")
@@ -0,0 +1,94 @@
+# view_cache.py
+# One persistent control tree per screen, kept on the page and toggled with
+# `visible` instead of page.clean() + rebuild. Revisiting a screen sends two
+# property changes over the websocket rather than the whole control tree.
+import time
+
+import flet as ft
+
+
+def count_controls(control):
+    """Size of a control subtree (what Flet has to serialize when it is added)."""
+    n = 1
+    for attr in ("controls", "content", "actions", "options"):
+        child = getattr(control, attr, None)
+        if isinstance(child, list):
+            n += sum(count_controls(c) for c in child if hasattr(c, "update"))
+        elif child is not None and hasattr(child, "update"):
+            n += count_controls(child)
+    return n
+
+
+def patch(control, **props):
+    """Set only properties whose value differs; returns how many changed."""
+    changed = 0
+    for name, value in props.items():
+        if getattr(control, name) != value:
+            setattr(control, name, value)
+            changed += 1
+    return changed
+
+
+class ViewCache:
+    def __init__(self, page):
+        self.page = page
+        self._views = {}
+        self.current = None
+        self.builds = 0
+        self.controls_sent = 0   # controls serialized because a view was new
+        self.nav_times = []      # seconds from show() until page.update() returned
+
+    def show(self, key, build, refresh=None):
+        """Show the view for `key`, calling build() the first time only.
+
+        refresh(view) runs on every visit and should use patch() for the few
+        properties that differ between visits.
+        """
+        start = time.perf_counter()
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = build()
+            view.visible = False
+            self.page.controls.append(view)
+            self.builds += 1
+            self.controls_sent += count_controls(view)
+        if refresh is not None:
+            self.controls_sent += refresh(view) or 0
+        if self.current is not view:
+            if self.current is not None:
+                self.current.visible = False
+            view.visible = True
+            self.controls_sent += 2
+            self.current = view
+        self.page.update()
+        self.nav_times.append(time.perf_counter() - start)
+        return view
+
+    def stats(self):
+        navs = len(self.nav_times)
+        return {"views": len(self._views), "builds": self.builds, "navigations": navs,
+                "controls_sent": self.controls_sent,
+                "avg_nav_ms": 1000 * sum(self.nav_times) / navs if navs else 0.0}
+
+
+if __name__ == "__main__":
+    # Controls sent per navigation, rebuild vs cached: python view_cache.py
+    class _Page:
+        def __init__(self):
+            self.controls = []
+        def update(self):
+            pass
+
+    def screen(n):
+        return lambda: ft.Column([ft.Text(f"Screen {n}", size=24),
+                                  *[ft.ElevatedButton(f"Task {i}", width=250) for i in range(8)],
+                                  ft.TextField(label="Phone"), ft.Text("🏆 Leaderboard")])
+
+    route = [0, 1, 2, 1, 0, 3, 1, 2] * 25
+    rebuilt = sum(count_controls(screen(n)()) for n in route)
+    views = ViewCache(_Page())
+    for n in route:
+        views.show(n, screen(n))
+    s = views.stats()
+    print(f"{len(route)} navigations: rebuild sends {rebuilt} controls, "
+          f"view cache sends {s['controls_sent']} ({s['builds']} builds, {s['avg_nav_ms']:.3f} ms avg)")
@@ -0,0 +1,106 @@
+# view_router.py
+# Route -> ft.View router that keeps constructed views alive. Views are built
+# lazily on first visit, pushed/popped on page.views instead of clearing it,
+# and the least recently used off-stack views are dropped past max_views.
+from collections import OrderedDict
+
+import flet as ft
+
+from view_cache import count_controls
+
+
+class ViewRouter:
+    def __init__(self, page, routes, max_views=8, on_enter=None):
+        """routes maps a route string to a builder returning that view's controls.
+
+        on_enter(route), if given, is called after each navigation.
+        """
+        self.page = page
+        self.routes = routes
+        self.max_views = max_views
+        self.on_enter = on_enter
+        self._cache = OrderedDict()  # route -> ft.View, least recently used first
+        self.builds = {}             # route -> times built
+        self.controls_built = 0      # controls instantiated by builders
+        page.on_route_change = self.route_change
+        page.on_view_pop = self.view_pop
+
+    def view(self, route):
+        v = self._cache.get(route)
+        if v is None:
+            v = ft.View(route, self.routes[route]())
+            self._cache[route] = v
+            self.builds[route] = self.builds.get(route, 0) + 1
+            self.controls_built += sum(count_controls(c) for c in v.controls)
+        self._cache.move_to_end(route)
+        return v
+
+    def route_change(self, e=None):
+        route = self.page.route if self.page.route in self.routes else "/"
+        stack = self.page.views
+        stack[:] = [v for v in stack if self._cache.get(v.route) is v]  # drop Flet's default view
+        on_stack = [v.route for v in stack]
+        if route in on_stack:  # back to an earlier step: pop down to it
+            del stack[on_stack.index(route) + 1:]
+        else:
+            stack.append(self.view(route))
+        self._evict()
+        self.page.update()
+        if self.on_enter is not None:
+            self.on_enter(route)
+
+    def view_pop(self, e=None):
+        stack = self.page.views
+        if len(stack) > 1:
+            stack.pop()
+            self.page.go(stack[-1].route)
+
+    def _evict(self):
+        live = {v.route for v in self.page.views}
+        for route in list(self._cache):
+            if len(self._cache) <= self.max_views:
+                break
+            if route not in live:
+                del self._cache[route]
+
+
+if __name__ == "__main__":
+    # Control instantiations per navigation: python view_router.py
+    class _Page:
+        route = "/"
+        def __init__(self):
+            self.views = []
+        def update(self):
+            pass
+        def go(self, route):
+            self.route = route
+            self.on_route_change(None)
+
+    page = _Page()
+    router = ViewRouter(page, {
+        "/": lambda: [ft.Text("Clicking Test"), ft.ElevatedButton("Click Me!")],
+        "/audio": lambda: [ft.Text("Audio Instruction Test"), ft.ElevatedButton("Next Test")],
+        "/navigate": lambda: [ft.Text("Navigation Test"), ft.ElevatedButton("Go to Next Test")],
+        "/swipe": lambda: [ft.Text("Swipe Test"), ft.Container(content=ft.Text("Swipe"))],
+    }, max_views=3)
+    # (route, built on this visit?): first visits build; going back down the
+    # stack or forward to a view still cached must not; /swipe is rebuilt only
+    # because max_views=3 evicted it while it was off the stack.
+    steps = [("/", True), ("/audio", True), ("/navigate", True), ("/swipe", True),
+             ("/navigate", False), ("/audio", False), ("/navigate", False),
+             ("/swipe", True), ("/", False)]
+    for route, builds in steps:
+        before, built = router.controls_built, dict(router.builds)
+        page.go(route)
+        print(f"{route:10s} stack={[v.route for v in page.views]}  "
+              f"controls built this nav: {router.controls_built - before}")
+        if builds:
+            assert router.builds[route] == built.get(route, 0) + 1, route
+        else:
+            assert router.controls_built == before and router.builds == built, f"{route} rebuilt"
+    page.go("/audio")
+    before, built = router.controls_built, dict(router.builds)
+    router.view_pop()  # system back from /audio to /
+    assert page.route == "/" and [v.route for v in page.views] == ["/"]
+    assert router.controls_built == before and router.builds == built, "back navigation rebuilt"
+    print("builds per route:", router.builds)